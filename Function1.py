@@ -3,28 +3,43 @@ import pandas as pd
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QFileDialog, QVBoxLayout,
     QPushButton, QWidget, QTableWidget, QTableWidgetItem,
-    QSpinBox, QLabel, QHBoxLayout, QHeaderView, QCheckBox, QSplitter, QMessageBox
+    QSpinBox, QLabel, QHBoxLayout, QHeaderView, QCheckBox, QSplitter, QMessageBox, QComboBox
 )
 from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QKeySequence, QShortcut
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 import folium
-from io import BytesIO
-import math
-
-# 地球半径（用于距离计算）
-EARTH_RADIUS = 6371
+import numpy as np
+from map_bridge import (MarkerBridge, install_bridge, bind_drag_events, show_map, move_markers, remove_markers,
+                        add_markers)
+from edit_journal import Edit, EditJournal
+from spatial_index import StaticIndex
+from station_store import StationStore
+from project_store import content_hash
+from distance_filter import PRECISION_MODES, default_precision, nearest_within, pair_distances
 
 class EarthquakeApp(QMainWindow):
+    CATALOGUES = ('yiban', 'jizhun', 'jiben', 'sifen')  # 保存到工程文件的台站目录
+
     def __init__(self):
         super().__init__()
 
-        self.yiban = None
+        self.yiban = None  # 各类台站均为 StationStore
         self.jizhun = None
         self.jiben = None
         self.sifen = None
-        self.filtered_sifen = None
+        self.filtered_sifen = None  # sifen 的筛选视图
+        self.yiban_index = None  # 一般站空间索引
+        self.result_rows = {}  # 预建设台站行号 -> 结果表格行号
+        self.last_max_distance = None
+        self.last_precision = default_precision()
+        self.project = None  # 当前工程（ProjectStore），用于缓存筛选结果
         self.use_satellite = False  # 默认使用2D地图
-        self.moved_markers = {}  # 用于存储移动后的标记位置
+        self.moved_rows = set()  # 被拖动过的预建设台站行号
+        self.results = []  # 当前结果表格内容
+        self.journal = EditJournal()  # 拖动和筛选的编辑日志，支持撤销/重做
+        self.bridge = MarkerBridge()
+        self.bridge.marker_moved.connect(self.on_marker_moved)
 
         self.setWindowTitle("台站距离筛选模块")
         self.setGeometry(200, 100, 1200, 700)
@@ -39,6 +54,7 @@ class EarthquakeApp(QMainWindow):
 
         # 地图窗口
         self.map_view = QWebEngineView()
+        self.channel = install_bridge(self.map_view, self.bridge)
         left_layout.addWidget(self.map_view)
 
         # 复选框设置
@@ -64,6 +80,18 @@ class EarthquakeApp(QMainWindow):
         check_layout.addWidget(self.show_sifen)
         left_layout.addLayout(check_layout)
 
+        # 撤销/重做
+        edit_layout = QHBoxLayout()
+        self.undo_btn = QPushButton("撤销")
+        self.redo_btn = QPushButton("重做")
+        self.undo_btn.clicked.connect(self.undo)
+        self.redo_btn.clicked.connect(self.redo)
+        edit_layout.addWidget(self.undo_btn)
+        edit_layout.addWidget(self.redo_btn)
+        left_layout.addLayout(edit_layout)
+        QShortcut(QKeySequence.StandardKey.Undo, self, self.undo)
+        QShortcut(QKeySequence.StandardKey.Redo, self, self.redo)
+
         # 切换地图类型按钮
         self.toggle_map_btn = QPushButton("切换为实景地图")
         self.toggle_map_btn.clicked.connect(self.toggle_map)
@@ -107,11 +135,19 @@ class EarthquakeApp(QMainWindow):
         self.distance_input.setRange(0, 1000)
         self.distance_input.setValue(5)
 
+        # 距离精度模式
+        self.precision_input = QComboBox()
+        for mode, (label, _) in PRECISION_MODES.items():
+            self.precision_input.addItem(label, mode)
+        self.precision_input.setCurrentIndex(self.precision_input.findData(default_precision()))
+
         self.filter_btn = QPushButton("筛选")
         self.filter_btn.clicked.connect(self.filter_data)
 
         filter_layout.addWidget(self.distance_label)
         filter_layout.addWidget(self.distance_input)
+        filter_layout.addWidget(QLabel("距离精度："))
+        filter_layout.addWidget(self.precision_input)
         filter_layout.addWidget(self.filter_btn)
         right_layout.addLayout(filter_layout)
 
@@ -169,51 +205,49 @@ class EarthquakeApp(QMainWindow):
 
         # 显示一般站
         if self.yiban is not None and self.show_yiban.isChecked():
-            for _, row in self.yiban.iterrows():
+            for name, lat, lon in zip(self.yiban.names, self.yiban.lat, self.yiban.lon):
                 folium.Marker(
-                    location=[row['纬度'], row['经度']],
-                    popup=row['站点名称'],
+                    location=[lat, lon],
+                    popup=name,
                     icon=folium.Icon(color="blue", icon="info-sign")
                 ).add_to(m)
 
         # 显示基准站
         if self.jizhun is not None and self.show_jizhun.isChecked():
-            for _, row in self.jizhun.iterrows():
+            for name, lat, lon in zip(self.jizhun.names, self.jizhun.lat, self.jizhun.lon):
                 folium.Marker(
-                    location=[row['纬度'], row['经度']],
-                    popup=row['站点名称'],
+                    location=[lat, lon],
+                    popup=name,
                     icon=folium.Icon(color="red", icon="flag")
                 ).add_to(m)
 
         # 显示基本站
         if self.jiben is not None and self.show_jiben.isChecked():
-            for _, row in self.jiben.iterrows():
+            for name, lat, lon in zip(self.jiben.names, self.jiben.lat, self.jiben.lon):
                 folium.Marker(
-                    location=[row['纬度'], row['经度']],
-                    popup=row['站点名称'],
+                    location=[lat, lon],
+                    popup=name,
                     icon=folium.Icon(color="green", icon="home")
                 ).add_to(m)
 
         # 显示预建设台站（仅显示筛选后的）
+        marker_keys = {}
         if self.show_sifen.isChecked() and self.filtered_sifen is not None:
-            for _, row in self.filtered_sifen.iterrows():
+            view = self.filtered_sifen
+            for idx, name, lat, lon in zip(view.rows.tolist(), view.names, view.lat, view.lon):
                 marker = folium.Marker(
-                    location=[row['纬度'], row['经度']],
-                    popup=row['站点名称'],
+                    location=[lat, lon],
+                    popup=name,
                     icon=folium.Icon(color="purple", icon="cloud"),
                     draggable=True
                 )
                 marker.add_to(m)
-                # 绑定拖动事件
-                marker.add_child(folium.ClickForMarker(popup=f"台站: {row['站点名称']}"))
-                marker.add_child(folium.LatLngPopup())
-                self.moved_markers[row['站点名称']] = marker
+                marker_keys[marker.get_name()] = str(idx)
+        # 绑定拖动事件，之后的编辑通过 window.stationMarkers 增量更新标记
+        bind_drag_events(m, marker_keys)
 
-        # 保存地图为 HTML，并替换完整性校验字段
-        data = BytesIO()
-        m.save(data, close_file=False)
-        html = data.getvalue().decode()
-        self.map_view.setHtml(html)
+        # 显示地图；内容超过 setHtml 上限时写入临时文件加载
+        show_map(self.map_view, m)
 
     # ========== 筛选功能 ==========
     def filter_data(self):
@@ -221,26 +255,58 @@ class EarthquakeApp(QMainWindow):
             return
 
         max_distance = self.distance_input.value()
-        results = []
-        filtered_rows = []
-
-        for _, row in self.sifen.iterrows():
-            lat, lon = row['纬度'], row['经度']
-            closest_station, min_distance = self.find_closest_station(lat, lon, self.yiban)
-            if min_distance <= max_distance:
-                results.append([row['站点名称'], closest_station, round(min_distance, 2)])
-                filtered_rows.append(row)
+        precision = self.precision_input.currentData()
+        input_hash = content_hash(self.sifen, self.yiban, max_distance, precision)
+        cached = self.project.load_stage('screen', input_hash) if self.project is not None else None
 
-        self.filtered_sifen = pd.DataFrame(filtered_rows)
+        if cached is not None:
+            # 输入未变化，直接使用工程中缓存的筛选结果
+            results, filtered_rows = cached
+        else:
+            # 先按纬度带和经度包围盒剔除远处的一般站，只对剩余台站对计算精确距离
+            nearest, distances = nearest_within(self.sifen.lat, self.sifen.lon, self.yiban.lat, self.yiban.lon,
+                                                max_distance, precision)
+            filtered_rows = np.flatnonzero(nearest >= 0).tolist()
+            results = [[self.sifen.name(idx), self.yiban.name(int(nearest[idx])), round(float(distances[idx]), 2)]
+                       for idx in filtered_rows]
+            if self.project is not None:
+                self.project.save_stage('screen', input_hash, {'max_distance': max_distance, 'precision': precision},
+                                        (results, filtered_rows))
+
+        after = ([list(r) for r in results], list(filtered_rows), max_distance, precision)
+        self.journal.record(Edit('filter', tuple(filtered_rows), self.filter_state(), after))
+        self.apply_filter_state(after)
+
+    def filter_state(self):
+        # 表格行会被拖动原地修改，日志中保存副本
+        return ([list(r) for r in self.results], list(self.result_rows), self.last_max_distance, self.last_precision)
+
+    def apply_filter_state(self, state):
+        """恢复筛选结果；地图上只增删筛选前后变化的预建设台站"""
+        results, filtered_rows, max_distance, precision = state
+        old_rows = set(self.result_rows)
+        self.results = [list(r) for r in results]  # 不与日志中的状态共用，拖动时原地修改不影响撤销/重做
+        self.result_rows = {idx: row for row, idx in enumerate(filtered_rows)}
+        self.filtered_sifen = self.sifen.view(filtered_rows) if max_distance is not None else None
+        self.last_max_distance = max_distance
+        self.last_precision = precision
         self.update_table(results)
-        self.update_map()
+
+        if self.show_sifen.isChecked():
+            new_rows = set(filtered_rows)
+            remove_markers(self.map_view, sorted(old_rows - new_rows))
+            add_markers(self.map_view,
+                        [(idx, self.sifen.lat[idx], self.sifen.lon[idx], self.sifen.name(idx))
+                         for idx in sorted(new_rows - old_rows)],
+                        color="purple", icon="cloud")
 
     # ========== 文件加载模块 ==========
     def load_yiban(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "选择一般站文件", "", "Excel Files (*.xlsx)")
         if file_path:
             try:
-                self.yiban = pd.read_excel(file_path)
+                self.yiban = StationStore.read_excel(file_path)
+                self.yiban_index = StaticIndex(self.yiban.lat, self.yiban.lon)
                 QMessageBox.information(self, "加载成功", "一般站文件加载成功！")  # 显示成功提示框
                 self.update_map()
             except Exception as e:
@@ -250,7 +316,7 @@ class EarthquakeApp(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, "选择基准站文件", "", "Excel Files (*.xlsx)")
         if file_path:
             try:
-                self.jizhun = pd.read_excel(file_path)
+                self.jizhun = StationStore.read_excel(file_path)
                 QMessageBox.information(self, "加载成功", "一般站文件加载成功！")  # 显示成功提示框
                 self.update_map()
             except Exception as e:
@@ -260,7 +326,7 @@ class EarthquakeApp(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, "选择基本站文件", "", "Excel Files (*.xlsx)")
         if file_path:
             try:
-                self.jiben = pd.read_excel(file_path)
+                self.jiben = StationStore.read_excel(file_path)
                 QMessageBox.information(self, "加载成功", "一般站文件加载成功！")  # 显示成功提示框
                 self.update_map()
             except Exception as e:
@@ -270,29 +336,111 @@ class EarthquakeApp(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, "选择预建设台站文件", "", "Excel Files (*.xlsx)")
         if file_path:
             try:
-                self.sifen = pd.read_excel(file_path)
+                self.sifen = StationStore.read_excel(file_path)
+                self.reset_results()
                 QMessageBox.information(self, "加载成功", "一般站文件加载成功！")  # 显示成功提示框
                 self.update_map()
             except Exception as e:
                 QMessageBox.critical(self, "加载失败", f"一般站文件加载失败: {e}")
 
-    def find_closest_station(self, lat, lon, stations):
-        min_distance = float('inf')
-        closest_station = ""
-        for _, row in stations.iterrows():
-            distance = self.haversine_distance(lat, lon, row['纬度'], row['经度'])
-            if distance < min_distance:
-                min_distance = distance
-                closest_station = row['站点名称']
-        return closest_station, min_distance
-
-    def haversine_distance(self, lat1, lon1, lat2, lon2):
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = math.sin(dlat / 2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        return EARTH_RADIUS * c
+    def reset_results(self):
+        """重新加载预建设台站后清空筛选结果和编辑日志（行号已失效）"""
+        self.filtered_sifen = None
+        self.result_rows = {}
+        self.results = []
+        self.last_max_distance = None
+        self.moved_rows = set()
+        self.journal.clear()
+
+    # ========== 工程文件 ==========
+    def save_project(self, project):
+        for key in self.CATALOGUES:
+            stations = getattr(self, key)
+            if stations is not None:
+                project.save_stations(key, stations)
+            else:
+                project.delete_stations(key)
+
+    def load_project(self, project):
+        for key in self.CATALOGUES:
+            setattr(self, key, project.load_stations(key))
+        self.yiban_index = StaticIndex(self.yiban.lat, self.yiban.lon) if self.yiban is not None else None
+        self.reset_results()
+
+        # 恢复上次的筛选参数；输入未变化时 filter_data 直接读取缓存结果
+        params = project.stage_params('screen')
+        if params is not None and self.sifen is not None and self.yiban is not None:
+            self.distance_input.setValue(params['max_distance'])
+            precision = params.get('precision', default_precision())
+            self.precision_input.setCurrentIndex(self.precision_input.findData(precision))
+            self.filter_data()
+            self.update_map()  # 台站整体替换，重新生成地图
+        else:
+            self.update_table([])
+            self.update_map()
+
+    # ========== 拖动台站后的增量筛选 ==========
+    def on_marker_moved(self, key, lat, lon):
+        idx = int(key)
+        if self.sifen is None or not 0 <= idx < len(self.sifen):
+            return
+        before = (float(self.sifen.lat[idx]), float(self.sifen.lon[idx]), idx in self.moved_rows)
+        self.journal.record(Edit('move', (idx,), before, (lat, lon, True)))
+        self.move_station(idx, lat, lon, True)
+
+    def move_station(self, idx, lat, lon, moved, update_marker=False):
+        # 原地更新台站坐标，筛选视图同步可见
+        self.sifen.move(idx, lat, lon)
+        name = self.sifen.name(idx)
+        if moved:
+            self.moved_rows.add(idx)
+        else:
+            self.moved_rows.discard(idx)
+        if update_marker and self.show_sifen.isChecked():
+            move_markers(self.map_view, [(idx, lat, lon)])
+
+        # 只对被拖动的台站重新查询最近的一般站，只更新对应的表格行
+        if self.yiban_index is None:
+            return
+        nearest, min_distance = self.yiban_index.nearest(lat, lon)
+        closest_station = self.yiban.name(nearest)
+        if self.last_precision != 'sphere':
+            # 与筛选时使用相同的距离精度
+            min_distance = float(pair_distances(lat, lon, self.yiban.lat[nearest], self.yiban.lon[nearest],
+                                                self.last_precision))
+        row = self.result_rows.get(idx)
+        if row is not None:
+            self.results[row] = [name, closest_station, round(min_distance, 2)]
+            self.table.setItem(row, 1, QTableWidgetItem(str(closest_station)))
+            self.table.setItem(row, 2, QTableWidgetItem(str(round(min_distance, 2))))
+
+        if self.last_max_distance is not None and min_distance <= self.last_max_distance:
+            self.statusBar().showMessage(
+                f"{name} 距一般站 {closest_station} {min_distance:.2f} km，仍小于筛选距离", 5000)
+        else:
+            self.statusBar().showMessage(f"{name} 距最近一般站 {closest_station} {min_distance:.2f} km", 5000)
+
+    # ========== 撤销/重做 ==========
+    def undo(self):
+        edit = self.journal.undo()
+        if edit is None:
+            self.statusBar().showMessage("没有可撤销的操作", 3000)
+            return
+        self.apply_edit(edit, edit.before)
+
+    def redo(self):
+        edit = self.journal.redo()
+        if edit is None:
+            self.statusBar().showMessage("没有可重做的操作", 3000)
+            return
+        self.apply_edit(edit, edit.after)
+
+    def apply_edit(self, edit, state):
+        if edit.kind == 'move':
+            lat, lon, moved = state
+            self.move_station(edit.rows[0], lat, lon, moved, update_marker=True)
+        elif edit.kind == 'filter':
+            self.apply_filter_state(state)
 
     def update_table(self, results):
         self.table.setRowCount(len(results))
@@ -309,14 +457,12 @@ class EarthquakeApp(QMainWindow):
             pd.DataFrame(data, columns=["预建设台站", "已建设台站", "相近距离 (km)"]).to_excel(file_path, index=False)
 
     def download_new_coords(self):
-        if not self.moved_markers:
+        if not self.moved_rows:
             self.statusBar().showMessage("没有移动的台站", 3000)
             return
 
-        data = []
-        for name, marker in self.moved_markers.items():
-            lat, lon = marker.location
-            data.append([name, lat, lon])
+        moved = sorted(self.moved_rows)
+        data = [[self.sifen.name(i), self.sifen.lat[i], self.sifen.lon[i]] for i in moved]
 
         file_path, _ = QFileDialog.getSaveFileName(self, "保存新位置坐标", "", "Excel Files (*.xlsx)")
         if file_path:
@@ -1,32 +1,34 @@
 import sys
+import numpy as np
 import pandas as pd
-from PyQt6.QtWidgets import QApplication, QMainWindow, QFileDialog, QVBoxLayout, QPushButton, QWidget, QTableWidget, QTableWidgetItem, QSpinBox, QLabel, QHBoxLayout, QHeaderView, QSplitter, QCheckBox, QMessageBox
+from PyQt6.QtWidgets import QApplication, QMainWindow, QFileDialog, QVBoxLayout, QPushButton, QWidget, QTableWidget, QTableWidgetItem, QSpinBox, QLabel, QHBoxLayout, QHeaderView, QSplitter, QCheckBox, QMessageBox, QComboBox
 from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QKeySequence, QShortcut
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 import folium
-from io import BytesIO
-from math import radians, sin, cos, sqrt, asin
-import itertools
-
-EARTH_RADIUS = 6371
-
-class DistanceCalculator:
-    @staticmethod
-    def haversine_distance(lat1, lon1, lat2, lon2):
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-        c = 2 * asin(sqrt(a))
-        return EARTH_RADIUS * c
+from map_bridge import (MarkerBridge, install_bridge, bind_drag_events, show_map, move_markers, remove_markers,
+                        add_markers)
+from edit_journal import Edit, EditJournal
+from spatial_index import DynamicIndex
+from station_store import StationStore
+from project_store import content_hash
+from distance_filter import PRECISION_MODES, default_precision, PREFILTER_MARGIN, pairs_within, pair_distances
+from station_thinning import THINNING_MODES, thin_stations
 
 class StationDistanceWidget(QWidget):
     def __init__(self):
         super().__init__()
-        self.stations = None
-        self.filtered_results = []
-        self.moved_markers = {}  # 初始化 moved_markers
+        self.stations = None  # StationStore，行号即稳定的台站ID
+        self.filtered_results = []  # [(台站ID_A, 台站ID_B, 距离km)]
+        self.station_index = None  # 台站空间索引（随拖动增量更新）
+        self.last_max_distance = None
+        self.last_precision = default_precision()
+        self.project = None  # 当前工程（ProjectStore），用于缓存自检查结果
+        self.moved_rows = set()  # 被拖动过的台站ID
+        self.journal = EditJournal()  # 拖动和筛选的编辑日志，支持撤销/重做
         self.use_satellite = False  # 默认使用2D地图
+        self.bridge = MarkerBridge()
+        self.bridge.marker_moved.connect(self.on_marker_moved)
         self.initUI()
 
     def initUI(self):
@@ -36,6 +38,7 @@ class StationDistanceWidget(QWidget):
         left_layout = QVBoxLayout()
 
         self.map_view = QWebEngineView()
+        self.channel = install_bridge(self.map_view, self.bridge)
         left_layout.addWidget(self.map_view)
 
         check_layout = QHBoxLayout()
@@ -46,6 +49,18 @@ class StationDistanceWidget(QWidget):
 
         left_layout.addLayout(check_layout)
 
+        # 撤销/重做
+        edit_layout = QHBoxLayout()
+        self.undo_btn = QPushButton("撤销")
+        self.redo_btn = QPushButton("重做")
+        self.undo_btn.clicked.connect(self.undo)
+        self.redo_btn.clicked.connect(self.redo)
+        edit_layout.addWidget(self.undo_btn)
+        edit_layout.addWidget(self.redo_btn)
+        left_layout.addLayout(edit_layout)
+        QShortcut(QKeySequence.StandardKey.Undo, self, self.undo)
+        QShortcut(QKeySequence.StandardKey.Redo, self, self.redo)
+
         # 切换地图类型按钮
         self.toggle_map_btn = QPushButton("切换为实景地图")
         self.toggle_map_btn.clicked.connect(self.toggle_map)
@@ -70,15 +85,36 @@ class StationDistanceWidget(QWidget):
         self.distance_input = QSpinBox()
         self.distance_input.setRange(0, 1000)
         self.distance_input.setValue(5)
+        self.precision_input = QComboBox()
+        for mode, (label, _) in PRECISION_MODES.items():
+            self.precision_input.addItem(label, mode)
+        self.precision_input.setCurrentIndex(self.precision_input.findData(default_precision()))
         self.filter_btn = QPushButton("筛选")
         self.filter_btn.clicked.connect(self.filter_data)
 
         filter_layout.addWidget(QLabel("最大筛选距离(km):"))
         filter_layout.addWidget(self.distance_input)
+        filter_layout.addWidget(QLabel("距离精度:"))
+        filter_layout.addWidget(self.precision_input)
         filter_layout.addWidget(self.filter_btn)
 
         right_layout.addLayout(filter_layout)
 
+        # 冲突消解：删除或合并间距小于筛选距离的台站
+        thinning_layout = QHBoxLayout()
+        self.thinning_input = QComboBox()
+        for mode, label in THINNING_MODES.items():
+            self.thinning_input.addItem(label, mode)
+        self.thinning_btn = QPushButton("消解冲突")
+        self.thinning_btn.clicked.connect(self.resolve_conflicts)
+        self.export_btn = QPushButton("导出台站")
+        self.export_btn.clicked.connect(self.export_stations)
+        thinning_layout.addWidget(QLabel("消解方式:"))
+        thinning_layout.addWidget(self.thinning_input)
+        thinning_layout.addWidget(self.thinning_btn)
+        thinning_layout.addWidget(self.export_btn)
+        right_layout.addLayout(thinning_layout)
+
         self.table = QTableWidget()
         self.table.setColumnCount(3)
         self.table.setHorizontalHeaderLabels(["预建设台站A", "预建设台站B", "最小距离(km)"])
@@ -109,9 +145,10 @@ class StationDistanceWidget(QWidget):
         file_path, _ = QFileDialog.getOpenFileName(self, "选择台站文件", "", "Excel Files (*.xlsx)")
         if file_path:
             try:
-                self.stations = pd.read_excel(file_path)
-                if not {'站点名称', '纬度', '经度'}.issubset(self.stations.columns):
-                    raise ValueError("文件缺少必要的列")
+                # 以加载顺序作为稳定的台站ID，重名台站也能唯一定位
+                self.stations = StationStore.read_excel(file_path)
+                self.reset_results()
+                self.display_results([])
                 self.update_map()
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"加载文件失败: {e}")
@@ -122,23 +159,218 @@ class StationDistanceWidget(QWidget):
             return
 
         max_distance = self.distance_input.value()
+        precision = self.precision_input.currentData()
+        input_hash = content_hash(self.stations, max_distance, precision)
+        cached = self.project.load_stage('self_check', input_hash) if self.project is not None else None
+
+        if cached is not None:
+            # 输入未变化，直接使用工程中缓存的自检查结果
+            results = cached
+        else:
+            # 先按纬度带和经度包围盒剔除远处的台站对，只对剩余台站对计算精确距离
+            names = self.stations.name_codes
+            i, j, distances = pairs_within(self.stations.lat, self.stations.lon, max_distance, precision)
+            keep = names[i] != names[j]  # 站点名称不相等时才筛选
+            results = [(a, b, round(d, 2))
+                       for a, b, d in zip(i[keep].tolist(), j[keep].tolist(), distances[keep].tolist())]
+            if self.project is not None:
+                self.project.save_stage('self_check', input_hash, {'max_distance': max_distance, 'precision': precision},
+                                        results)
+
+        after = (results, max_distance, precision)
+        before = (self.filtered_results, self.last_max_distance, self.last_precision)
+        self.journal.record(Edit('filter', (), before, after))
+        self.apply_filter_state(after)
+
+    def apply_filter_state(self, state):
+        """恢复自检查结果；地图上只增删前后变化的台站"""
+        old_ids = self.marker_ids()
+        self.set_results(*state)
+        self.update_markers(old_ids)
+
+    def set_results(self, results, max_distance, precision):
+        self.filtered_results = list(results)
+        if max_distance is not None:
+            # 索引半径略放大，拖动后的候选台站再按所选精度计算距离
+            self.station_index = DynamicIndex(self.stations.lat, self.stations.lon, max_distance * PREFILTER_MARGIN)
+        else:
+            self.station_index = None
+        self.last_max_distance = max_distance
+        self.last_precision = precision
+        self.display_results(self.filtered_results)
+
+    # ========== 冲突消解 ==========
+    def resolve_conflicts(self):
+        """按最小间距删除或合并相近台站，结果整体替换当前台站（可撤销）"""
+        if self.stations is None:
+            QMessageBox.warning(self, "警告", "请先加载台站文件！")
+            return
+        max_distance = self.distance_input.value()
+        precision = self.precision_input.currentData()
+        mode = self.thinning_input.currentData()
+        try:
+            # 手动拖动过的台站优先保留
+            weights = np.zeros(len(self.stations))
+            weights[sorted(self.moved_rows)] = 1
+            result = thin_stations(self.stations, max_distance, mode, weights, precision, ignore_same_name=True)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"冲突消解失败: {e}")
+            return
+        if not result.removed:
+            QMessageBox.information(self, "提示", "没有需要消解的相近台站")
+            return
+
+        # 消解后台站ID重新编号，合并到拖动过台站的结果仍视为已移动
+        moved = set(result.source[sorted(self.moved_rows)].tolist()) if self.moved_rows else set()
+        if mode != 'drop':
+            moved |= set(np.flatnonzero(np.bincount(result.source, minlength=len(result.stations)) > 1).tolist())
+        after = (result.stations, [], max_distance, precision, moved)
+        self.journal.record(Edit('stations', (), self.stations_state(), after))
+        self.apply_stations_state(after)
+        QMessageBox.information(self, "提示", f"消解完成：{len(result.source)} 个台站减少为 {len(result.stations)} 个"
+                                              f"（{result.rounds} 轮）")
+
+    def stations_state(self):
+        return (self.stations, self.filtered_results, self.last_max_distance, self.last_precision,
+                set(self.moved_rows))
+
+    def apply_stations_state(self, state):
+        stations, results, max_distance, precision, moved_rows = state
+        self.stations = stations
+        self.moved_rows = set(moved_rows)
+        self.set_results(results, max_distance, precision)
+        self.update_map()  # 台站ID已变化，重新生成地图
+
+    def export_stations(self):
+        if self.stations is None:
+            QMessageBox.warning(self, "警告", "请先加载台站文件！")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "导出台站", "", "Excel Files (*.xlsx)")
+        if file_path:
+            self.stations.to_frame().to_excel(file_path, index=False)
+
+    def marker_ids(self):
+        """地图上显示的台站ID（出现在任一相近台站对中的台站）"""
+        return {i for pair in self.filtered_results for i in pair[:2]}
+
+    def update_markers(self, old_ids, moved=None):
+        """按显示台站集合的变化增删标记；moved 为需要移动的台站ID"""
+        if not self.show_stations.isChecked():
+            return
+        new_ids = self.marker_ids()
+        remove_markers(self.map_view, sorted(old_ids - new_ids))
+        add_markers(self.map_view, [(i, self.stations.lat[i], self.stations.lon[i], self.stations.name(i))
+                                    for i in sorted(new_ids - old_ids)])
+        if moved is not None and moved in old_ids and moved in new_ids:
+            move_markers(self.map_view, [(moved, self.stations.lat[moved], self.stations.lon[moved])])
+
+    def reset_results(self):
+        """重新加载台站后清空自检查结果和编辑日志（台站ID已失效）"""
         self.filtered_results = []
+        self.station_index = None
+        self.last_max_distance = None
+        self.moved_rows = set()
+        self.journal.clear()
+
+    # ========== 工程文件 ==========
+    def save_project(self, project):
+        if self.stations is not None:
+            project.save_stations('self_check', self.stations)
+        else:
+            project.delete_stations('self_check')
+
+    def load_project(self, project):
+        self.stations = project.load_stations('self_check')
+        self.reset_results()
+
+        # 恢复上次的筛选参数；输入未变化时 filter_data 直接读取缓存结果
+        params = project.stage_params('self_check')
+        if params is not None and self.stations is not None:
+            self.distance_input.setValue(params['max_distance'])
+            precision = params.get('precision', default_precision())
+            self.precision_input.setCurrentIndex(self.precision_input.findData(precision))
+            self.filter_data()
+            self.update_map()  # 台站整体替换，重新生成地图
+        else:
+            self.display_results([])
+            self.update_map()
 
-        pairs = itertools.combinations(self.stations.index, 2)
-        for i, j in pairs:
-            row1 = self.stations.loc[i]
-            row2 = self.stations.loc[j]
-            if row1['站点名称'] != row2['站点名称']:  # 站点名称不相等时才筛选
-                distance = DistanceCalculator.haversine_distance(row1['纬度'], row1['经度'], row2['纬度'], row2['经度'])
-                if distance <= max_distance:
-                    self.filtered_results.append([row1['站点名称'], row2['站点名称'], round(distance, 2)])
+    # ========== 拖动台站后的增量自检查 ==========
+    def on_marker_moved(self, key, lat, lon):
+        idx = int(key)
+        if self.stations is None or not 0 <= idx < len(self.stations):
+            return
+        before = (float(self.stations.lat[idx]), float(self.stations.lon[idx]), idx in self.moved_rows)
+        self.journal.record(Edit('move', (idx,), before, (lat, lon, True)))
+        self.move_station(idx, lat, lon, True)
+
+    def move_station(self, idx, lat, lon, moved, update_marker=False):
+        # 原地更新台站坐标
+        self.stations.move(idx, lat, lon)
+        if moved:
+            self.moved_rows.add(idx)
+        else:
+            self.moved_rows.discard(idx)
+        if self.station_index is None:
+            if update_marker and self.show_stations.isChecked():
+                move_markers(self.map_view, [(idx, lat, lon)])
+            return
 
-        self.display_results(self.filtered_results)
-        self.update_map()  # **筛选成功后刷新地图**
+        # 只重算与被拖动台站相关的相近台站对，表格中只删除和追加这些行
+        old_ids = self.marker_ids()
+        self.station_index.move(idx, lat, lon)
+        stale = [row for row, r in enumerate(self.filtered_results) if idx in (r[0], r[1])]
+        for row in reversed(stale):
+            del self.filtered_results[row]
+            self.table.removeRow(row)
+
+        names = self.stations.name_codes
+        neighbors, _ = self.station_index.neighbors(idx)
+        distances = pair_distances(lat, lon, self.stations.lat[neighbors], self.stations.lon[neighbors],
+                                   self.last_precision)
+        for j, distance in zip(neighbors.tolist(), distances):
+            if names[j] != names[idx] and distance <= self.last_max_distance:
+                pair = (min(idx, j), max(idx, j), round(float(distance), 2))
+                self.filtered_results.append(pair)
+                self.append_result_row(pair)
+
+        self.update_markers(old_ids, idx if update_marker else None)
+
+    def result_rows(self, results):
+        """将 (台站ID_A, 台站ID_B, 距离) 转换为 [名称A, 名称B, 距离]，只查询结果中出现的台站名称"""
+        name = self.stations.name
+        return [[name(i), name(j), distance] for i, j, distance in results]
+
+    def append_result_row(self, pair):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        for j, value in enumerate(self.result_rows([pair])[0]):
+            self.table.setItem(row, j, QTableWidgetItem(str(value)))
+
+    # ========== 撤销/重做 ==========
+    def undo(self):
+        edit = self.journal.undo()
+        if edit is not None:
+            self.apply_edit(edit, edit.before)
+
+    def redo(self):
+        edit = self.journal.redo()
+        if edit is not None:
+            self.apply_edit(edit, edit.after)
+
+    def apply_edit(self, edit, state):
+        if edit.kind == 'move':
+            lat, lon, moved = state
+            self.move_station(edit.rows[0], lat, lon, moved, update_marker=True)
+        elif edit.kind == 'filter':
+            self.apply_filter_state(state)
+        elif edit.kind == 'stations':
+            self.apply_stations_state(state)
 
     def display_results(self, results):
-        self.table.setRowCount(len(results))
-        for i, row in enumerate(results):
+        rows = self.result_rows(results)
+        self.table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
             for j, value in enumerate(row):
                 self.table.setItem(i, j, QTableWidgetItem(str(value)))
 
@@ -167,49 +399,39 @@ class StationDistanceWidget(QWidget):
         from folium.plugins import MousePosition
         MousePosition(position="bottomleft", separator=" | ", empty_string="No coordinates").add_to(m)
 
+        marker_keys = {}
         if self.filtered_results and self.show_stations.isChecked():
-            for station_a, station_b, _ in self.filtered_results:
-                row_a = self.stations.loc[self.stations['站点名称'] == station_a].iloc[0]
-                row_b = self.stations.loc[self.stations['站点名称'] == station_b].iloc[0]
-
-                marker_a = folium.Marker(
-                    location=[row_a['纬度'], row_a['经度']],
-                    popup=row_a['站点名称'],
+            # 每个台站只绘制一次，即使它出现在多个台站对中
+            station_ids = sorted({i for pair in self.filtered_results for i in pair[:2]})
+            rows = self.stations.view(station_ids)
+            for station_id, name, lat, lon in zip(station_ids, rows.names, rows.lat, rows.lon):
+                marker = folium.Marker(
+                    location=[lat, lon],
+                    popup=name,
                     draggable=True
                 )
-                marker_a.add_to(m)
-                self.moved_markers[row_a['站点名称']] = marker_a
+                marker.add_to(m)
+                marker_keys[marker.get_name()] = str(station_id)
 
-                marker_b = folium.Marker(
-                    location=[row_b['纬度'], row_b['经度']],
-                    popup=row_b['站点名称'],
-                    draggable=True
-                )
-                marker_b.add_to(m)
-                self.moved_markers[row_b['站点名称']] = marker_b
+        # 绑定拖动事件
+        bind_drag_events(m, marker_keys)
 
-        data = BytesIO()
-        m.save(data, close_file=False)
-        html = data.getvalue().decode()
-        self.map_view.setHtml(html)
+        # 显示地图；内容超过 setHtml 上限时写入临时文件加载
+        show_map(self.map_view, m)
 
     def save_results(self):
         file_path, _ = QFileDialog.getSaveFileName(self, "保存结果", "", "Excel Files (*.xlsx)")
         if file_path:
-            data = []
-            for row in range(self.table.rowCount()):
-                data.append([self.table.item(row, col).text() for col in range(self.table.columnCount())])
+            data = self.result_rows(self.filtered_results) if self.stations is not None else []
             pd.DataFrame(data, columns=["预建设台站A", "预建设台站B", "相近距离 (km)"]).to_excel(file_path, index=False)
 
     def download_new_coords(self):
-        if not self.moved_markers:
+        if not self.moved_rows:
             QMessageBox.information(self, "提示", "没有移动的台站")
             return
 
-        data = []
-        for name, marker in self.moved_markers.items():
-            lat, lon = marker.location
-            data.append([name, lat, lon])
+        moved = self.stations.view(sorted(self.moved_rows))
+        data = list(zip(moved.names, moved.lat, moved.lon))
 
         file_path, _ = QFileDialog.getSaveFileName(self, "保存新位置坐标", "", "Excel Files (*.xlsx)")
         if file_path:
@@ -1,5 +1,4 @@
 import sys
-import math
 import pandas as pd
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QLabel,
@@ -8,25 +7,40 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtCore import Qt
-from io import BytesIO
+from PyQt6.QtGui import QKeySequence, QShortcut
 import folium
 from folium import Map, Marker, Icon
 from folium.plugins import MarkerCluster
 from scipy.spatial import ConvexHull
-from shapely.geometry import Polygon, Point
+from shapely.geometry import Polygon
 import numpy as np
-
-EARTH_RADIUS = 6371  # 地球半径（km）
+from map_bridge import MarkerBridge, install_bridge, bind_drag_events, show_map, move_markers
+from edit_journal import Edit, EditJournal
+from spatial_index import DynamicIndex
+from station_store import StationStore
+from project_store import content_hash
+from fault_io import FaultSet, read_faults
+from fault_layer import FaultLayer
+from station_coverage import analyze_coverage, coverage_layer
+from geodesy import get_model
+from station_grid import generate_grid
 
 class StationApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("台站生成模块")
         self.setGeometry(100, 100, 1200, 800)
-        self.moved_markers = {}  # 初始化 moved_markers
+        self.stations = None  # 生成的台站（StationStore），行号与表格行一致
+        self.station_index = None  # 生成台站空间索引（随拖动增量更新）
         self.use_satellite = False  # 默认使用2D地图
         self.polygon_points = None
-        self.fault_lines = []  # 存储断裂带数据
+        self.fault_lines = FaultSet.empty()  # 存储断裂带数据
+        self.project = None  # 当前工程（ProjectStore），用于缓存生成的网格
+        self.coverage_result = None  # 最近一次覆盖分析结果
+        self.external_stations = lambda: []  # 其他模块已加载的台站（由主界面注入）
+        self.journal = EditJournal()  # 拖动和生成的编辑日志，支持撤销/重做
+        self.bridge = MarkerBridge()
+        self.bridge.marker_moved.connect(self.on_marker_moved)
         self.initUI()
 
     def initUI(self):
@@ -38,6 +52,7 @@ class StationApp(QMainWindow):
 
         # 地图
         self.map_view = QWebEngineView()
+        self.channel = install_bridge(self.map_view, self.bridge)
         left_layout.addWidget(self.map_view)
 
         # 切换地图类型按钮
@@ -45,6 +60,18 @@ class StationApp(QMainWindow):
         self.toggle_map_btn.clicked.connect(self.toggle_map)
         left_layout.addWidget(self.toggle_map_btn)
 
+        # 撤销/重做
+        edit_layout = QHBoxLayout()
+        self.undo_btn = QPushButton("撤销")
+        self.redo_btn = QPushButton("重做")
+        self.undo_btn.clicked.connect(self.undo)
+        self.redo_btn.clicked.connect(self.redo)
+        edit_layout.addWidget(self.undo_btn)
+        edit_layout.addWidget(self.redo_btn)
+        left_layout.addLayout(edit_layout)
+        QShortcut(QKeySequence.StandardKey.Undo, self, self.undo)
+        QShortcut(QKeySequence.StandardKey.Redo, self, self.redo)
+
         # 下载新位置坐标按钮
         self.download_btn = QPushButton("下载新位置坐标")
         self.download_btn.clicked.connect(self.download_new_coords)
@@ -104,6 +131,27 @@ class StationApp(QMainWindow):
         self.generate_btn.clicked.connect(self.generate_stations)
         right_layout.addWidget(self.generate_btn)
 
+        # 覆盖分析
+        coverage_layout = QHBoxLayout()
+        self.coverage_input = QSpinBox()
+        self.coverage_input.setRange(1, 500)
+        self.coverage_input.setValue(10)
+        self.coverage_btn = QPushButton("覆盖分析")
+        self.coverage_btn.clicked.connect(self.analyze_coverage)
+        coverage_layout.addWidget(QLabel("覆盖半径（km）："))
+        coverage_layout.addWidget(self.coverage_input)
+        coverage_layout.addWidget(self.coverage_btn)
+        right_layout.addLayout(coverage_layout)
+
+        # 断裂带避让距离（候选台站流水线使用，0 表示不避让）
+        fault_buffer_layout = QHBoxLayout()
+        self.fault_buffer_input = QSpinBox()
+        self.fault_buffer_input.setRange(0, 100)
+        self.fault_buffer_input.setValue(0)
+        fault_buffer_layout.addWidget(QLabel("断裂带避让距离（km）："))
+        fault_buffer_layout.addWidget(self.fault_buffer_input)
+        right_layout.addLayout(fault_buffer_layout)
+
         # 输出文本框
         self.output_table = QTableWidget()
         self.output_table.setColumnCount(2)
@@ -138,45 +186,14 @@ class StationApp(QMainWindow):
         self.update_map()
 
     def load_fault_data(self):
-        """导入断裂带数据"""
+        """导入断裂带数据（GMT 多段文本 / GeoJSON / Shapefile）"""
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "选择断裂带文件", "", "Text Files (*.txt)")
+            self, "选择断裂带文件", "", "Fault Files (*.txt *.gmt *.geojson *.json *.shp)")
         if not file_path:
             return
 
-        self.fault_lines = []
-        current_coords = []
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    if line.startswith('>'):
-                        if current_coords:
-                            self.fault_lines.append({
-                                'name': '幕府山焦山断裂带',
-                                'coordinates': current_coords.copy()
-                            })
-                            current_coords = []
-                    else:
-                        parts = line.split()
-                        if len(parts) == 2:
-                            try:
-                                lon = float(parts[0])
-                                lat = float(parts[1])
-                                current_coords.append((lat, lon))  # 转换为（纬度，经度）
-                            except ValueError:
-                                continue
-
-                # 处理最后一个块
-                if current_coords:
-                    self.fault_lines.append({
-                        'name': '幕府山焦山断裂带',
-                        'coordinates': current_coords.copy()
-                    })
-
+            self.fault_lines = read_faults(file_path)
             self.update_map()
         except Exception as e:
             QMessageBox.critical(self, "错误", f"文件解析失败: {str(e)}")
@@ -204,85 +221,35 @@ class StationApp(QMainWindow):
                 opacity=1
             ).add_to(m)
 
-        # 绘制断裂带
-        for fault in self.fault_lines:
-            # 绘制红色线段
-            line = folium.PolyLine(
-                locations=fault['coordinates'],
-                color='red',
-                weight=3,
-                opacity=0.8,
-                popup=folium.Popup(fault['name'], max_width=300)
-            ).add_to(m)
+        # 绘制断裂带（单个 GeoJSON 图层，共用一个缩放处理函数）
+        if len(self.fault_lines):
+            FaultLayer(self.fault_lines).add_to(m)
 
-            # 在线段中间添加文字标注（动态字体大小）
-            if len(fault['coordinates']) >= 2:
-                mid_index = len(fault['coordinates']) // 2
-                mid_point = fault['coordinates'][mid_index]
-                marker_id = f"label_{id(fault)}"
-                folium.Marker(
-                    location=mid_point,
-                    icon=folium.DivIcon(
-                        html=f'''
-                        <div id="{marker_id}" style="
-                            font-size: 14px;
-                            color: red;
-                            font-weight: bold;
-                            text-align: center;
-                            white-space: nowrap;
-                        ">{fault["name"]}</div>
-                        ''',
-                        icon_size=(150, 36)
-                    )
-                ).add_to(m)
-
-                # 添加 JavaScript 监听缩放事件，动态调整字体大小
-                m.get_root().html.add_child(folium.Element(f"""
-                    <script>
-                        function adjustLabelSize() {{
-                            var zoom = map.getZoom();
-                            var fontSize = Math.max(10, zoom * 2) + 'px';
-                            var label = document.getElementById('{marker_id}');
-                            if (label) {{
-                                label.style.fontSize = fontSize;
-                            }}
-                        }}
-                        map.on('zoomend', adjustLabelSize);
-                        adjustLabelSize();  // 初始化时调整一次
-                    </script>
-                """))
+        # 绘制覆盖盲区
+        if self.coverage_result is not None:
+            coverage_layer(self.coverage_result).add_to(m)
 
         # 添加鼠标位置显示
         from folium.plugins import MousePosition
         MousePosition(position="bottomleft", separator=" | ", empty_string="No coordinates").add_to(m)
 
         # 绘制台站
-        if self.moved_markers:
+        if self.stations is not None and len(self.stations):
             marker_cluster = MarkerCluster().add_to(m)
-            for name, (lat, lon) in self.moved_markers.items():
+            marker_keys = {}
+            for row, (lat, lon) in enumerate(zip(self.stations.lat, self.stations.lon)):
                 marker = Marker(
                     location=[lat, lon],
                     icon=Icon(color="red", icon="cloud"),
                     draggable=True
                 ).add_to(marker_cluster)
+                marker_keys[marker.get_name()] = str(row)
 
-                # 使用 JavaScript 在拖动结束后更新坐标
-                js = f"""
-                function onDragEnd(e) {{
-                    var marker = e.target;
-                    var newLat = marker.getLatLng().lat;
-                    var newLng = marker.getLatLng().lng;
-                    window.pybridge.send('{name}:' + newLat + ',' + newLng);
-                }}
-                marker.on('dragend', onDragEnd);
-                """
-                marker.add_child(folium.Element(f'<script>{js}</script>'))
+            # 拖动结束后通过 pybridge 回传新坐标
+            bind_drag_events(m, marker_keys, marker_cluster)
 
         # 渲染地图
-        data = BytesIO()
-        m.save(data, close_file=False)
-        html = data.getvalue().decode()
-        self.map_view.setHtml(html)
+        show_map(self.map_view, m)
 
 
     # ========== 切换地图类型 ==========
@@ -295,28 +262,12 @@ class StationApp(QMainWindow):
         self.update_map()
 
     def create_grid(self, polygon, interval):
-        lat_min, lon_min, lat_max, lon_max = polygon.bounds
-        lat_step = interval / 111  # 1度纬度约111公里
-        lon_step = interval / (111 * math.cos(math.radians(lat_min)))
-
-        lat_values = np.arange(lat_min, lat_max, lat_step)
-        lon_values = np.arange(lon_min, lon_max, lon_step)
-
-        stations = []
-        for lat in lat_values:
-            for lon in lon_values:
-                point = Point(lat, lon)
-                if polygon.contains(point):
-                    stations.append((lat, lon))
-
-        if not stations:
-            raise ValueError("生成台站失败：间隔过大或四边形面积不足")
-
-        return stations
+        # 与流水线、批量场景共用同一个网格生成实现
+        return generate_grid(polygon, interval, 'square')
 
     def display_stations(self, stations):
         self.output_table.setRowCount(len(stations))
-        for i, (lat, lon) in enumerate(stations):
+        for i, (lat, lon) in enumerate(zip(stations.lat, stations.lon)):
             self.output_table.setItem(i, 0, QTableWidgetItem(f"{lat:.6f}"))
             self.output_table.setItem(i, 1, QTableWidgetItem(f"{lon:.6f}"))
 
@@ -332,19 +283,24 @@ class StationApp(QMainWindow):
             df = pd.DataFrame(data, columns=["纬度", "经度"])
             df.to_csv(file_path, index=False)
 
+    def region_points(self):
+        """读取输入的四个顶点坐标 [(纬度, 经度)]"""
+        points = []
+        for lat_input, lon_input in self.coord_inputs:
+            lat = float(lat_input.text().strip())
+            lon = float(lon_input.text().strip())
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError(f"无效的坐标: 纬度={lat}, 经度={lon}")
+            points.append((lat, lon))
+
+        if len(points) != 4:
+            raise ValueError("需要完整的四个顶点坐标")
+        return points
+
     def generate_stations(self):
         try:
             # 读取输入的四个坐标
-            points = []
-            for lat_input, lon_input in self.coord_inputs:
-                lat = float(lat_input.text().strip())
-                lon = float(lon_input.text().strip())
-                if not (-90 <= lat <= 90 and -180 <= lon <= 180):
-                    raise ValueError(f"无效的坐标: 纬度={lat}, 经度={lon}")
-                points.append((lat, lon))
-
-            if len(points) != 4:
-                raise ValueError("需要完整的四个顶点坐标")
+            points = self.region_points()
 
             # === 使用 ConvexHull 修复输入顺序 ===
             points_array = np.array(points)
@@ -360,30 +316,156 @@ class StationApp(QMainWindow):
                 raise ValueError("生成的四边形无效")
 
             interval = self.distance_input.value()
-            stations = self.create_grid(polygon, interval)
-
-            if not stations:
+            input_hash = content_hash(ordered_points, interval, get_model())
+            stations = self.project.load_stage('grid', input_hash) if self.project is not None else None
+            if stations is None:
+                stations = self.create_grid(polygon, interval)
+                if self.project is not None:
+                    self.project.save_stage('grid', input_hash,
+                                            {'points': points, 'interval': interval, 'model': get_model()}, stations)
+
+            if not len(stations):
                 raise ValueError("生成台站失败：间隔过大或四边形面积不足")
 
-            # 存储生成的台站
-            self.moved_markers = {f"Station_{i + 1}": (lat, lon) for i, (lat, lon) in enumerate(stations)}
-            self.polygon_points = list(polygon.exterior.coords)[:-1]  # 去掉闭合的重复点
-
-            # 显示台站和更新地图
-            self.display_stations(stations)
-            self.update_map()
+            # 存储生成的台站（整体替换，记录到编辑日志以便撤销）
+            after = (stations, list(polygon.exterior.coords)[:-1], interval)  # 去掉闭合的重复点
+            self.journal.record(Edit('stations', (), self.stations_state(), after))
+            self.apply_stations_state(after)
 
         except Exception as e:
             QMessageBox.critical(self, "错误", str(e))
 
+    def stations_state(self):
+        radius = self.station_index.radius_km if self.station_index is not None else None
+        return (self.stations, self.polygon_points, radius)
+
+    def apply_stations_state(self, state):
+        stations, polygon_points, interval = state
+        self.stations = stations
+        self.polygon_points = polygon_points
+        self.coverage_result = None
+        if stations is not None and interval is not None:
+            self.station_index = DynamicIndex(stations.lat, stations.lon, interval)
+        else:
+            self.station_index = None
+
+        # 显示台站和更新地图
+        self.display_stations(stations if stations is not None else StationStore([], []))
+        self.update_map()
+
+    # ========== 覆盖分析 ==========
+    def analyze_coverage(self):
+        if not self.polygon_points:
+            QMessageBox.warning(self, "警告", "请先生成台站区域")
+            return
+
+        stations = list(self.external_stations())
+        if self.stations is not None:
+            stations.append(self.stations)
+        radius = self.coverage_input.value()
+        try:
+            self.coverage_result = analyze_coverage(Polygon(self.polygon_points), stations, radius)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"覆盖分析失败: {e}")
+            return
+
+        result = self.coverage_result
+        self.update_map()
+        QMessageBox.information(
+            self, "覆盖分析",
+            f"区域面积: {result.total_area:.1f} km²\n"
+            f"未覆盖面积: {result.uncovered_area:.1f} km²（覆盖率 {result.coverage_ratio:.1%}）\n"
+            f"盲区数量: {len(result.gaps)}")
+
+    # ========== 工程文件 ==========
+    def save_project(self, project):
+        project.save_faults('faults', self.fault_lines)
+        if self.stations is not None:
+            project.save_stations('grid', self.stations)
+        else:
+            project.delete_stations('grid')
+
+    def load_project(self, project):
+        self.fault_lines = project.load_faults('faults')
+        self.stations = project.load_stations('grid')
+        self.station_index = None
+        self.polygon_points = None
+        self.journal.clear()
+
+        # 恢复生成参数；网格直接从工程读取（包含拖动后的位置），无需重新生成
+        params = project.stage_params('grid')
+        if params is not None:
+            for (lat_input, lon_input), (lat, lon) in zip(self.coord_inputs, params['points']):
+                lat_input.setText(f"{lat}")
+                lon_input.setText(f"{lon}")
+            self.distance_input.setValue(params['interval'])
+            if self.stations is not None:
+                points_array = np.array(params['points'])
+                hull = ConvexHull(points_array)
+                self.polygon_points = [tuple(points_array[i]) for i in hull.vertices]
+                self.station_index = DynamicIndex(self.stations.lat, self.stations.lon, params['interval'])
+
+        self.display_stations(self.stations if self.stations is not None else StationStore([], []))
+        self.update_map()
+
+    # ========== 拖动台站后的增量检查 ==========
+    def on_marker_moved(self, key, lat, lon):
+        row = int(key)
+        if self.stations is None or not 0 <= row < len(self.stations):
+            return
+        before = (float(self.stations.lat[row]), float(self.stations.lon[row]))
+        self.journal.record(Edit('move', (row,), before, (lat, lon)))
+        self.move_station(row, lat, lon)
+
+    def move_station(self, row, lat, lon, update_marker=False):
+        # 原地更新台站坐标和对应表格行
+        self.stations.move(row, lat, lon)
+        name = self.stations.name(row)
+        self.output_table.setItem(row, 0, QTableWidgetItem(f"{lat:.6f}"))
+        self.output_table.setItem(row, 1, QTableWidgetItem(f"{lon:.6f}"))
+        if update_marker:
+            move_markers(self.map_view, [(row, lat, lon)])
+
+        # 只检查被拖动台站周围间隔范围内的台站
+        if self.station_index is None:
+            return
+        self.station_index.move(row, lat, lon)
+        neighbors, distances = self.station_index.neighbors(row)
+        if len(neighbors):
+            nearest = int(np.argmin(distances))
+            self.statusBar().showMessage(
+                f"{name} 与 {self.stations.name(neighbors[nearest])} 相距 {distances[nearest]:.2f} km，"
+                f"小于生成间隔 {self.station_index.radius_km} km", 5000)
+        else:
+            self.statusBar().showMessage(f"{name} 新位置: {lat:.6f}, {lon:.6f}", 5000)
+
+    # ========== 撤销/重做 ==========
+    def undo(self):
+        edit = self.journal.undo()
+        if edit is None:
+            self.statusBar().showMessage("没有可撤销的操作", 3000)
+            return
+        self.apply_edit(edit, edit.before)
+
+    def redo(self):
+        edit = self.journal.redo()
+        if edit is None:
+            self.statusBar().showMessage("没有可重做的操作", 3000)
+            return
+        self.apply_edit(edit, edit.after)
+
+    def apply_edit(self, edit, state):
+        if edit.kind == 'move':
+            self.move_station(edit.rows[0], *state, update_marker=True)
+        elif edit.kind == 'stations':
+            self.apply_stations_state(state)
+
     def download_new_coords(self):
-        if not self.moved_markers:
+        if self.stations is None or not len(self.stations):
             QMessageBox.information(self, "提示", "没有移动的台站")
             return
 
-        data = []
-        for name, (lat, lon) in self.moved_markers.items():
-            data.append([lat, lon])  # 只保存纬度和经度
+        data = list(zip(self.stations.lat, self.stations.lon))  # 只保存纬度和经度
 
         file_path, _ = QFileDialog.getSaveFileName(self, "保存新位置坐标", "", "Excel Files (*.xlsx)")
         if file_path:
@@ -5,17 +5,26 @@
 # @Software: PyCharm
 # @E-mail  : 937887153@qq.com
 import sys
-from PyQt6.QtWidgets import QApplication, QMainWindow, QTabWidget, QVBoxLayout, QWidget
+from PyQt6.QtWidgets import QApplication, QMainWindow, QTabWidget, QVBoxLayout, QWidget, QFileDialog, QMessageBox
+from PyQt6.QtGui import QActionGroup
 
 from Function1 import EarthquakeApp
 from Function2 import StationDistanceWidget
 from Function3 import StationApp
+from project_store import ProjectStore, content_hash
+from geodesy import MODELS, get_model, set_model
+from station_grid import region_polygon
+from station_pipeline import StationPipeline
+from edit_journal import Edit
 
 class CombinedApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("智能台站布设系统")
         self.setGeometry(200, 100, 1200, 800)
+        self.project = None  # 当前打开的工程文件
+        self.pipeline = StationPipeline()  # 候选台站流水线，保留各阶段结果，参数变化时只重算下游
+        self.existing_hash = None  # 已建设台站内容哈希，台站被拖动（原地修改）时使流水线筛选阶段失效
 
         self.initUI()
 
@@ -27,6 +36,9 @@ class CombinedApp(QMainWindow):
         self.distance_tab = StationDistanceWidget()
         self.station_tab = StationApp()
 
+        # 覆盖分析同时考虑距离筛选模块中已加载的各类台站
+        self.station_tab.external_stations = self.loaded_stations
+
         tab_widget.addTab(self.earthquake_tab, "台站距离筛选模块")
         tab_widget.addTab(self.distance_tab, "台站自检查模块")
         tab_widget.addTab(self.station_tab, "台站生成模块")
@@ -56,6 +68,137 @@ class CombinedApp(QMainWindow):
 
         self.setCentralWidget(container)
 
+        # 工程菜单
+        project_menu = self.menuBar().addMenu("工程")
+        project_menu.addAction("新建工程", self.new_project)
+        project_menu.addAction("打开工程", self.open_project)
+        project_menu.addAction("保存工程", self.save_project)
+
+        # 距离模型菜单：统一切换筛选、自检查和台站生成使用的距离计算方式
+        model_menu = self.menuBar().addMenu("距离模型")
+        self.model_group = QActionGroup(self)
+        for model, label in MODELS.items():
+            action = model_menu.addAction(label)
+            action.setCheckable(True)
+            action.setChecked(model == get_model())
+            action.triggered.connect(lambda checked, model=model: self.set_distance_model(model))
+            self.model_group.addAction(action)
+
+        # 工具菜单
+        tools_menu = self.menuBar().addMenu("工具")
+        tools_menu.addAction("运行候选台站流水线", self.run_pipeline)
+        tools_menu.addAction("导出流水线结果", self.export_pipeline)
+
+    def loaded_stations(self):
+        stations = [getattr(self.earthquake_tab, key) for key in self.earthquake_tab.CATALOGUES]
+        return [s for s in stations if s is not None]
+
+    def set_distance_model(self, model):
+        set_model(model)
+        for module in self.modules():
+            precision_input = getattr(module, 'precision_input', None)
+            if precision_input is not None:
+                precision_input.setCurrentIndex(precision_input.findData(model))
+        self.statusBar().showMessage(f"距离模型已切换为{MODELS[model]}", 3000)
+
+    # ========== 候选台站流水线 ==========
+    def update_pipeline(self):
+        """从各模块读取流水线参数"""
+        # 与台站筛选模块一致，只按一般站筛选候选台站
+        yiban = self.earthquake_tab.yiban
+        existing = (yiban,) if yiban is not None else ()
+        existing_hash = content_hash(*existing)
+        self.pipeline.set(
+            region=self.station_tab.region_points(),
+            interval=self.station_tab.distance_input.value(),
+            model=get_model(),  # 切换距离模型后重新生成网格
+            faults=self.station_tab.fault_lines,
+            fault_buffer=self.station_tab.fault_buffer_input.value(),
+            existing=existing,
+            screen_radius=self.earthquake_tab.distance_input.value(),
+            dedupe_radius=self.distance_tab.distance_input.value(),
+            dedupe_mode=self.distance_tab.thinning_input.currentData(),
+            precision=self.distance_tab.precision_input.currentData(),
+        )
+        if existing_hash != self.existing_hash:
+            self.pipeline.invalidate('existing')
+            self.existing_hash = existing_hash
+
+    def run_pipeline(self):
+        """生成 → 断裂带避让 → 与已建设台站筛选 → 自检查去重，结果载入台站生成模块"""
+        try:
+            self.update_pipeline()
+            stations = self.pipeline.result('dedupe')
+            computed = self.pipeline.computed
+            counts = self.pipeline.counts()
+            if not len(stations):
+                raise ValueError("流水线未生成任何候选台站")
+
+            polygon = region_polygon(self.pipeline.params['region'])
+            after = (stations.materialize(), list(polygon.exterior.coords)[:-1], self.pipeline.params['interval'])
+            station_tab = self.station_tab
+            station_tab.journal.record(Edit('stations', (), station_tab.stations_state(), after))
+            station_tab.apply_stations_state(after)
+
+            labels = {'generate': "生成", 'faults': "断裂带避让", 'screen': "已建设台站筛选", 'dedupe': "自检查去重"}
+            lines = [f"{labels[name]}: {count} 个台站" for name, count in counts.items()]
+            lines.append("本次重新计算: " + ("、".join(labels[name] for name in computed) if computed else "无（使用缓存结果）"))
+            QMessageBox.information(self, "候选台站流水线", "\n".join(lines))
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"流水线运行失败: {e}")
+
+    def export_pipeline(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "导出流水线结果", "", "Excel Files (*.xlsx)")
+        if not file_path:
+            return
+        try:
+            self.update_pipeline()
+            frame = self.pipeline.export(file_path)
+            self.statusBar().showMessage(f"已导出 {len(frame)} 个候选台站", 3000)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"导出失败: {e}")
+
+    # ========== 工程文件 ==========
+    def modules(self):
+        return (self.earthquake_tab, self.distance_tab, self.station_tab)
+
+    def set_project(self, project):
+        if self.project is not None:
+            self.project.close()
+        self.project = project
+        for module in self.modules():
+            module.project = project
+
+    def new_project(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "新建工程", "", "Project Files (*.sqlite)")
+        if file_path:
+            project = ProjectStore(file_path)
+            project.clear()  # 覆盖已有文件时不沿用其中的台站和阶段缓存
+            self.set_project(project)
+            self.save_project()
+
+    def open_project(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "打开工程", "", "Project Files (*.sqlite)")
+        if not file_path:
+            return
+        try:
+            self.set_project(ProjectStore(file_path))
+            for module in self.modules():
+                module.load_project(self.project)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"打开工程失败: {e}")
+
+    def save_project(self):
+        if self.project is None:
+            self.new_project()
+            return
+        try:
+            for module in self.modules():
+                module.save_project(self.project)
+            self.statusBar().showMessage("工程保存成功", 3000)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"保存工程失败: {e}")
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = CombinedApp()
@@ -0,0 +1,100 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from distance_filter import PRECISION_MODES, nearest_within, pairs_within
+from geodesy import equirectangular, geodesic, haversine, vincenty
+from oracle_check import CHECK_COLUMNS, SIZES, oracle_cases, run_cases
+
+DISTANCE_COLUMNS = ["方法", "台站对数", "耗时(s)", "每百万对耗时(s)", "与WGS84最大偏差(m)", "与WGS84最大相对偏差"]
+FILTER_COLUMNS = ["筛选", "精度", "台站数", "半径(km)", "耗时(s)", "结果数"]
+ORACLE_COLUMNS = CHECK_COLUMNS + ["参考耗时(s)", "实现耗时(s)", "加速比"]
+
+
+def timed(func, *args, repeat=3):
+    """返回 (最短耗时s, 结果)"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def random_pairs(n, spread_km=5, seed=0):
+    """随机生成 n 个相距不超过约 spread_km 的台站对，覆盖 ±80° 纬度和 180° 经线两侧"""
+    rng = np.random.default_rng(seed)
+    lat1 = rng.uniform(-80, 80, n)
+    lon1 = rng.uniform(-180, 180, n)
+    spread = spread_km / 111
+    lat2 = np.clip(lat1 + rng.uniform(-spread, spread, n), -90, 90)
+    lon2 = (lon1 + rng.uniform(-spread, spread, n) / np.cos(np.radians(lat1)) + 180) % 360 - 180
+    return lat1, lon1, lat2, lon2
+
+
+def random_stations(n, bounds=(20, 40, 100, 120), seed=0):
+    rng = np.random.default_rng(seed)
+    lat_min, lat_max, lon_min, lon_max = bounds
+    return rng.uniform(lat_min, lat_max, n), rng.uniform(lon_min, lon_max, n)
+
+
+def benchmark_distances(n, spread_km=5, repeat=3):
+    """各距离公式的耗时，以及与 WGS84 椭球面距离的偏差"""
+    pairs = random_pairs(n, spread_km)
+    _, reference = timed(geodesic, *pairs, repeat=1)
+    methods = [("等距圆柱近似", equirectangular), ("球面 haversine", haversine),
+               ("WGS84 Vincenty", vincenty), ("WGS84 geodesic", geodesic)]
+    rows = []
+    for label, func in methods:
+        seconds, result = timed(func, *pairs, repeat=repeat)
+        error = np.abs(result - reference)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            relative = np.nanmax(np.where(reference > 0, error / reference, 0.0))
+        rows.append([label, n, round(seconds, 4), round(seconds / n * 1e6, 4),
+                     round(float(error.max()) * 1000, 3), f"{relative:.3%}"])
+    return pd.DataFrame(rows, columns=DISTANCE_COLUMNS)
+
+
+def benchmark_filters(n, radius, repeat=1):
+    """两阶段筛选在各精度模式下的耗时：预建设台站对已建设台站的最近站筛选、台站自检查"""
+    lat, lon = random_stations(n, seed=1)
+    query_lat, query_lon = random_stations(n, seed=2)
+    rows = []
+    for precision in PRECISION_MODES:
+        seconds, (nearest, _) = timed(nearest_within, query_lat, query_lon, lat, lon, radius, precision,
+                                      repeat=repeat)
+        rows.append(["最近站筛选", precision, n, radius, round(seconds, 4), int((nearest >= 0).sum())])
+        seconds, (i, _, _) = timed(pairs_within, lat, lon, radius, precision, repeat=repeat)
+        rows.append(["台站自检查", precision, n, radius, round(seconds, 4), len(i)])
+    return pd.DataFrame(rows, columns=FILTER_COLUMNS)
+
+
+def benchmark_oracles(sizes=SIZES, repeat=1, seed=0):
+    """原始逐个比较算法与加速实现的耗时对比，同时校验结果一致（见 oracle_check）"""
+    rows = []
+    for n in sizes:
+        for row, reference_seconds, seconds in run_cases(oracle_cases(n, seed),
+                                                         lambda func: timed(func, repeat=repeat)):
+            rows.append(row + [round(reference_seconds, 4), round(seconds, 4), round(reference_seconds / seconds, 1)])
+    return pd.DataFrame(rows, columns=ORACLE_COLUMNS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="距离模型与筛选性能测试")
+    parser.add_argument("--pairs", type=int, default=1_000_000, help="距离公式测试的台站对数")
+    parser.add_argument("--stations", type=int, default=100_000, help="筛选测试的台站数")
+    parser.add_argument("--radius", type=float, default=5, help="筛选半径（km）")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最短耗时）")
+    parser.add_argument("--check", nargs="*", type=int, default=None,
+                        help="同时与原始算法比较并校验结果，可指定合成台站数（默认 %s）" % " ".join(map(str, SIZES)))
+    args = parser.parse_args()
+
+    print(benchmark_distances(args.pairs, repeat=args.repeat).to_string(index=False))
+    print()
+    print(benchmark_filters(args.stations, args.radius).to_string(index=False))
+    if args.check is not None:
+        print()
+        table = benchmark_oracles(args.check or SIZES)
+        print(table.to_string(index=False))
+        if not table["一致"].all():
+            raise SystemExit("存在与参考实现不一致的结果")
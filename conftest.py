@@ -0,0 +1 @@
+# 让 tests/ 下的测试可以直接导入仓库根目录的模块
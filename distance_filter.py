@@ -0,0 +1,147 @@
+import math
+import numpy as np
+from geodesy import EARTH_RADIUS, MODELS, equirectangular, geodesic, get_model, haversine, wrap_longitude
+
+# 精度模式：名称 -> (界面显示文字, 精确距离函数)；sphere/wgs84 与 geodesy 的距离模型对应
+PRECISION_MODES = {
+    'sphere': (MODELS['sphere'] + "（haversine）", haversine),
+    'wgs84': (MODELS['wgs84'], geodesic),
+    'approx': ("近似（等距圆柱）", equirectangular),
+}
+
+PREFILTER_MARGIN = 1.01  # 预筛选范围放大系数，椭球面与球面距离之差不超过 0.6%
+MAX_CANDIDATES = 4_000_000  # 每批精确计算的候选台站对数量上限，控制内存占用
+
+
+def default_precision():
+    """默认精度跟随 geodesy 的全局距离模型"""
+    return get_model()
+
+
+def distance_function(precision=None):
+    precision = precision or default_precision()
+    if precision not in PRECISION_MODES:
+        raise ValueError(f"未知的距离精度: {precision}")
+    return PRECISION_MODES[precision][1]
+
+
+def pair_distances(lat1, lon1, lat2, lon2, precision=None):
+    """按所选精度计算台站对距离（km）"""
+    return distance_function(precision)(lat1, lon1, lat2, lon2)
+
+
+def search_window(lats, radius_km):
+    """距离不超过 radius_km 的点所在的纬度差与经度差上限（度）
+
+    纬度差上限为球心角；经度差上限取 asin(sin d / cos φ)，靠近两极时不限制经度
+    """
+    angle = min(radius_km * PREFILTER_MARGIN / EARTH_RADIUS, math.pi)
+    dlat = math.degrees(angle)
+    cos_lat = np.cos(np.radians(np.asarray(lats, dtype=np.float64)))
+    with np.errstate(divide='ignore'):
+        ratio = math.sin(angle) / cos_lat
+    dlon = np.where((ratio < 1) & (angle < math.pi / 2), np.degrees(np.arcsin(np.minimum(ratio, 1.0))), 180.0)
+    return dlat, dlon
+
+
+def _expand(starts, stops):
+    """将每个查询点的候选区间 [start, stop) 展开为扁平的 (查询号, 候选位置) 数组"""
+    counts = np.maximum(stops - starts, 0)
+    query = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.cumsum(counts) - counts
+    position = np.arange(counts.sum()) - np.repeat(offsets, counts) + np.repeat(starts, counts)
+    return query, position
+
+
+def _batches(counts):
+    """按候选数量把查询点分批，每批不超过 MAX_CANDIDATES 个候选对"""
+    cumulative = np.cumsum(counts)
+    start = 0
+    while start < len(counts):
+        base = cumulative[start - 1] if start else 0
+        stop = int(np.searchsorted(cumulative, base + MAX_CANDIDATES, side='right'))
+        stop = max(stop, start + 1)
+        yield start, stop
+        start = stop
+
+
+def _candidates(q_lat, q_lon, s_lat, s_lon, starts, stops, dlon):
+    """纬度带内的候选对再用经度差做包围盒检查，只用加减法"""
+    query, position = _expand(starts, stops)
+    keep = np.abs(wrap_longitude(s_lon[position] - q_lon[query])) <= dlon[query]
+    return query[keep], position[keep]
+
+
+def nearest_within(query_lat, query_lon, station_lat, station_lon, radius_km, precision=None):
+    """两阶段筛选：查找每个查询点在 radius_km 内最近的台站
+
+    第一阶段按纬度排序后用纬度带 + 经度包围盒剔除远处台站，第二阶段只对剩余台站对计算精确距离。
+    返回 (台站行号, 距离km)，半径内没有台站的查询点为 (-1, inf)
+    """
+    distance = distance_function(precision)
+    q_lat = np.asarray(query_lat, dtype=np.float64)
+    q_lon = np.asarray(query_lon, dtype=np.float64)
+    s_lat = np.asarray(station_lat, dtype=np.float64)
+    s_lon = np.asarray(station_lon, dtype=np.float64)
+    nearest = np.full(len(q_lat), -1, dtype=np.int64)
+    nearest_distance = np.full(len(q_lat), np.inf)
+    if not len(q_lat) or not len(s_lat):
+        return nearest, nearest_distance
+
+    order = np.argsort(s_lat, kind='stable')
+    sorted_lat, sorted_lon = s_lat[order], s_lon[order]
+    dlat, dlon = search_window(q_lat, radius_km)
+    starts = np.searchsorted(sorted_lat, q_lat - dlat, side='left')
+    stops = np.searchsorted(sorted_lat, q_lat + dlat, side='right')
+
+    for lo, hi in _batches(stops - starts):
+        query, position = _candidates(q_lat[lo:hi], q_lon[lo:hi], sorted_lat, sorted_lon,
+                                      starts[lo:hi], stops[lo:hi], dlon[lo:hi])
+        if not len(query):
+            continue
+        d = distance(q_lat[lo:hi][query], q_lon[lo:hi][query], sorted_lat[position], sorted_lon[position])
+        keep = d <= radius_km
+        query, position, d = query[keep], order[position[keep]], d[keep]
+        # 每个查询点取距离最小者，距离相同时取行号小的台站（与逐个比较的结果一致）
+        best = np.lexsort((position, d, query))
+        query, position, d = query[best], position[best], d[best]
+        first = np.r_[True, query[1:] != query[:-1]]
+        nearest[lo + query[first]] = position[first]
+        nearest_distance[lo + query[first]] = d[first]
+    return nearest, nearest_distance
+
+
+def pairs_within(lats, lons, radius_km, precision=None):
+    """两阶段筛选：返回距离不超过 radius_km 的所有台站对 (i, j, 距离km)，i < j，按 (i, j) 排序"""
+    distance = distance_function(precision)
+    lat = np.asarray(lats, dtype=np.float64)
+    lon = np.asarray(lons, dtype=np.float64)
+    empty = np.empty(0, dtype=np.int64)
+    if len(lat) < 2:
+        return empty, empty, np.empty(0)
+
+    order = np.argsort(lat, kind='stable')
+    sorted_lat, sorted_lon = lat[order], lon[order]
+    dlat, dlon = search_window(sorted_lat, radius_km)
+    # 只向纬度更大的一侧查找，每个台站对只检查一次
+    starts = np.arange(1, len(lat))
+    stops = np.searchsorted(sorted_lat, sorted_lat[:-1] + dlat, side='right')
+
+    result_i, result_j, result_d = [], [], []
+    for lo, hi in _batches(stops - starts):
+        query, position = _candidates(sorted_lat[lo:hi], sorted_lon[lo:hi], sorted_lat, sorted_lon,
+                                      starts[lo:hi], stops[lo:hi], dlon[lo:hi])
+        if not len(query):
+            continue
+        query += lo
+        d = distance(sorted_lat[query], sorted_lon[query], sorted_lat[position], sorted_lon[position])
+        keep = d <= radius_km
+        a, b = order[query[keep]], order[position[keep]]
+        result_i.append(np.minimum(a, b))
+        result_j.append(np.maximum(a, b))
+        result_d.append(d[keep])
+    if not result_i:
+        return empty, empty, np.empty(0)
+    i, j, d = np.concatenate(result_i), np.concatenate(result_j), np.concatenate(result_d)
+    ordered = np.lexsort((j, i))
+    return i[ordered], j[ordered], d[ordered]
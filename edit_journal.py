@@ -0,0 +1,65 @@
+from collections import deque
+from dataclasses import dataclass
+
+MAX_EDITS = 10000  # 最多可撤销的编辑步数
+
+
+@dataclass
+class Edit:
+    """一次编辑的增量记录
+
+    kind: 'move'（拖动台站）、'filter'（重新筛选）、'stations'（整体替换台站，如重新生成）
+    rows: 涉及的台站行号
+    before / after: 编辑前后的状态，由各模块自行解释，撤销时恢复 before，重做时恢复 after
+    """
+    kind: str
+    rows: tuple
+    before: object
+    after: object
+
+
+class EditJournal:
+    """编辑日志：记录台站移动和筛选变化，支持撤销/重做
+
+    新的编辑会清空重做记录；超过 limit 步时丢弃最早的编辑。
+    """
+
+    def __init__(self, limit=MAX_EDITS):
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = []
+
+    def __len__(self):
+        return len(self.undo_stack)
+
+    @property
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def record(self, edit):
+        self.undo_stack.append(edit)
+        self.redo_stack.clear()
+        return edit
+
+    def undo(self):
+        """返回要撤销的编辑（调用方恢复其 before 状态），没有可撤销的编辑时返回 None"""
+        if not self.undo_stack:
+            return None
+        edit = self.undo_stack.pop()
+        self.redo_stack.append(edit)
+        return edit
+
+    def redo(self):
+        """返回要重做的编辑（调用方恢复其 after 状态），没有可重做的编辑时返回 None"""
+        if not self.redo_stack:
+            return None
+        edit = self.redo_stack.pop()
+        self.undo_stack.append(edit)
+        return edit
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
@@ -0,0 +1,239 @@
+import json
+import os
+import re
+import numpy as np
+
+DEFAULT_FAULT_NAME = '幕府山焦山断裂带'  # 段头未提供名称时使用的默认名称
+
+# GMT 段头中的 -L"名称"/-Z值 形式选项（只在开头或空白之后，避免拆开带连字符的名称）和 key=value 形式属性
+_GMT_OPTION = re.compile(r'(?<!\S)-([A-Za-z])(?:"([^"]*)"|\'([^\']*)\'|(\S+))')
+_KEY_VALUE = re.compile(r'([^\s=]+)=(?:"([^"]*)"|\'([^\']*)\'|(\S+))')
+
+
+class FaultSet:
+    """断裂带集合：扁平的坐标数组 + 分段偏移 + 每段的段头元数据
+
+    第 i 段的坐标为 lat[offsets[i]:offsets[i + 1]]、lon[offsets[i]:offsets[i + 1]]。
+    """
+    __slots__ = ('lat', 'lon', 'offsets', 'meta', '_simplified')
+
+    def __init__(self, lat, lon, offsets, meta):
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.meta = list(meta)
+        self._simplified = {}
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0), np.empty(0), [0], [])
+
+    @classmethod
+    def from_segments(cls, segments, meta):
+        """segments: [(纬度数组, 经度数组)]，空段会被丢弃"""
+        kept = [(seg, m) for seg, m in zip(segments, meta) if len(seg[0])]
+        if not kept:
+            return cls.empty()
+        lat = np.concatenate([np.asarray(seg[0], dtype=np.float64) for seg, _ in kept])
+        lon = np.concatenate([np.asarray(seg[1], dtype=np.float64) for seg, _ in kept])
+        offsets = np.cumsum([0] + [len(seg[0]) for seg, _ in kept])
+        return cls(lat, lon, offsets, [m for _, m in kept])
+
+    def __len__(self):
+        return len(self.meta)
+
+    @property
+    def vertex_count(self):
+        return len(self.lat)
+
+    def name(self, i):
+        return self.meta[i].get('name', DEFAULT_FAULT_NAME)
+
+    def segment(self, i):
+        """返回第 i 段的 (纬度, 经度) 视图"""
+        a, b = self.offsets[i], self.offsets[i + 1]
+        return self.lat[a:b], self.lon[a:b]
+
+    def coordinates(self, i):
+        lat, lon = self.segment(i)
+        return list(zip(lat.tolist(), lon.tolist()))
+
+    def simplify(self, tolerance):
+        """逐段 Douglas–Peucker 抽稀，tolerance 单位为度"""
+        keep = douglas_peucker(self.lon, self.lat, tolerance, self.offsets)
+        counts = np.add.reduceat(keep, self.offsets[:-1]) if len(self) else np.empty(0, dtype=np.int64)
+        return FaultSet(self.lat[keep], self.lon[keep], np.concatenate([[0], np.cumsum(counts)]), self.meta)
+
+    def simplified(self, zoom):
+        """按缩放级别抽稀（容差约为该级别下的 1 个像素），结果按级别缓存
+
+        已缓存更细级别时在其结果上继续抽稀，点数少得多。
+        """
+        zoom = int(zoom)
+        if zoom not in self._simplified:
+            finer = [z for z in self._simplified if z > zoom]
+            source = self._simplified[min(finer)] if finer else self
+            self._simplified[zoom] = source.simplify(pixel_degrees(zoom))
+        return self._simplified[zoom]
+
+
+def pixel_degrees(zoom):
+    """Web 墨卡托瓦片在指定缩放级别下 1 个像素对应的经度跨度"""
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def douglas_peucker(x, y, tolerance, offsets=None):
+    """Douglas–Peucker 抽稀，返回保留点的布尔掩码
+
+    offsets 给出多段折线的分段偏移，所有段同时处理：每轮迭代对所有未完成的区间
+    向量化求最远点，迭代次数只取决于递归深度，与段数无关。各段首尾点总是保留。
+    """
+    n = len(x)
+    offsets = np.asarray([0, n] if offsets is None else offsets, dtype=np.int64)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[offsets[:-1]] = True
+    keep[offsets[1:] - 1] = True
+    pending = ~keep  # 所在区间尚未完成判断的点
+
+    while pending.any():
+        kept = np.flatnonzero(keep)
+        cand = np.flatnonzero(pending)
+        pos = np.searchsorted(kept, cand)
+        left, right = kept[pos - 1], kept[pos]
+
+        dx, dy = x[right] - x[left], y[right] - y[left]
+        px, py = x[cand] - x[left], y[cand] - y[left]
+        length = np.hypot(dx, dy)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dist = np.where(length > 0, np.abs(dx * py - dy * px) / length, np.hypot(px, py))
+
+        # 候选点按位置有序，同一区间的点连续排列
+        starts = np.flatnonzero(np.r_[True, left[1:] != left[:-1]])
+        group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(cand)]))
+        max_dist = np.maximum.reduceat(dist, starts)
+        at_max = np.flatnonzero(dist == max_dist[group])
+        first = np.r_[True, group[at_max][1:] != group[at_max][:-1]]
+        farthest = cand[at_max[first]]
+
+        split = max_dist > tolerance
+        keep[farthest[split]] = True
+        pending[cand[~split[group]]] = False
+        pending[farthest[split]] = False
+    return keep
+
+
+def parse_gmt_header(line):
+    """解析 GMT 多段文件的 '>' 段头，返回元数据字典"""
+    text = line.lstrip('>').strip()
+    meta = {}
+    for match in _GMT_OPTION.finditer(text):
+        key, value = match.group(1), next(v for v in match.group(2, 3, 4) if v is not None)
+        meta['name' if key == 'L' else key] = value
+    text = _GMT_OPTION.sub('', text)
+    for match in _KEY_VALUE.finditer(text):
+        meta[match.group(1)] = next(v for v in match.group(2, 3, 4) if v is not None)
+    text = _KEY_VALUE.sub('', text).strip()
+    if text and 'name' not in meta:
+        meta['name'] = text
+    return meta
+
+
+def read_gmt(file_path):
+    """读取 GMT 多段文本（经度 纬度），'>' 为段头，'#' 为注释"""
+    with open(file_path, 'rb') as f:
+        lines = f.read().decode('utf-8-sig').splitlines()
+
+    headers = [i for i, line in enumerate(lines) if line.startswith('>')]
+    bounds = [-1] + headers + [len(lines)]
+    segments, meta = [], []
+    for k in range(len(bounds) - 1):
+        block = lines[bounds[k] + 1:bounds[k + 1]]
+        block = [line for line in block if line.strip() and not line.lstrip().startswith('#')]
+        segments.append(_parse_block(block))
+        meta.append(parse_gmt_header(lines[bounds[k]]) if k > 0 else {})
+    return FaultSet.from_segments(segments, meta)
+
+
+def _parse_block(block):
+    """批量解析一段坐标行，返回 (纬度, 经度)"""
+    if not block:
+        return np.empty(0), np.empty(0)
+    if all(len(parts) == 2 for parts in map(str.split, block)):
+        # 快速路径：每行恰好两列，直接整体转换
+        try:
+            values = np.array(' '.join(block).split(), dtype=np.float64).reshape(-1, 2)
+            return values[:, 1], values[:, 0]
+        except ValueError:
+            pass
+    # 慢速路径：逐行解析，跳过列数不是两列或无法解析的行
+    lon, lat = [], []
+    for line in block:
+        parts = line.split()
+        if len(parts) == 2:
+            try:
+                x, y = float(parts[0]), float(parts[1])
+            except ValueError:
+                continue
+            lon.append(x)
+            lat.append(y)
+    return np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+
+
+def _feature_meta(properties):
+    meta = {k: v for k, v in (properties or {}).items() if v is not None}
+    for key in ('name', 'NAME', 'Name', '名称', '断裂名称'):
+        if key in meta:
+            meta['name'] = str(meta[key])
+            break
+    return meta
+
+
+def read_geojson(file_path):
+    """读取 GeoJSON 中的 LineString / MultiLineString 要素"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    features = data['features'] if data.get('type') == 'FeatureCollection' else [data]
+    segments, meta = [], []
+    for feature in features:
+        geometry = feature.get('geometry') or feature
+        parts = {'LineString': [geometry.get('coordinates')],
+                 'MultiLineString': geometry.get('coordinates')}.get(geometry.get('type'), [])
+        properties = _feature_meta(feature.get('properties'))
+        for part in parts:
+            coords = np.asarray(part, dtype=np.float64).reshape(-1, np.shape(part)[-1] if len(part) else 2)
+            segments.append((coords[:, 1], coords[:, 0]))
+            meta.append(dict(properties))
+    return FaultSet.from_segments(segments, meta)
+
+
+def read_shapefile(file_path):
+    """读取 Shapefile 线图层（需要安装 pyshp）"""
+    try:
+        import shapefile
+    except ImportError:
+        raise ImportError("读取 Shapefile 需要安装 pyshp：pip install pyshp")
+
+    reader = shapefile.Reader(file_path)
+    fields = [field[0] for field in reader.fields[1:]]
+    segments, meta = [], []
+    for shape_record in reader.iterShapeRecords():
+        shape = shape_record.shape
+        points = np.asarray(shape.points, dtype=np.float64).reshape(-1, 2)
+        properties = _feature_meta(dict(zip(fields, shape_record.record)))
+        parts = list(shape.parts) + [len(points)]
+        for a, b in zip(parts[:-1], parts[1:]):
+            segments.append((points[a:b, 1], points[a:b, 0]))
+            meta.append(dict(properties))
+    return FaultSet.from_segments(segments, meta)
+
+
+def read_faults(file_path):
+    """按扩展名读取断裂带文件"""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in ('.geojson', '.json'):
+        return read_geojson(file_path)
+    if ext == '.shp':
+        return read_shapefile(file_path)
+    return read_gmt(file_path)
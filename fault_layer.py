@@ -0,0 +1,174 @@
+import html
+import json
+import numpy as np
+from branca.element import Element, MacroElement
+from jinja2 import Template
+
+ZOOM_LEVELS = (4, 7, 10, 13)  # 预先抽稀的缩放级别，地图按不超过当前级别的最细一级显示
+
+
+COORD_SCALE = 100000  # 坐标以 1e-5 度（约 1 m）为单位的整数传输，序列化比浮点数快得多
+
+
+def compact_level(faults):
+    """抽稀后的 FaultSet 转为扁平整数数组，在浏览器端组装 GeoJSON"""
+    return {'lat': np.rint(faults.lat * COORD_SCALE).astype(np.int64).tolist(),
+            'lon': np.rint(faults.lon * COORD_SCALE).astype(np.int64).tolist(),
+            'offsets': faults.offsets.tolist()}
+
+
+def script_json(data):
+    """序列化为可直接嵌入 <script> 的 JSON"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+def fault_labels(faults):
+    """每条断裂带在中点处的标注，按折线长度降序排列（碰撞时优先保留长断裂带）"""
+    if not len(faults):
+        return []
+    starts, ends = faults.offsets[:-1], faults.offsets[1:]
+    step = np.hypot(np.diff(faults.lat), np.diff(faults.lon))
+    cumulative = np.concatenate([[0.0], np.cumsum(step)])
+    extent = cumulative[ends - 1] - cumulative[starts]
+    mid = starts + (ends - starts) // 2
+    labels = []
+    for i in np.argsort(-extent, kind='stable'):
+        if ends[i] - starts[i] < 2:
+            continue
+        labels.append({'name': html.escape(str(faults.name(i))),
+                       'lat': round(float(faults.lat[mid[i]]), 6), 'lon': round(float(faults.lon[mid[i]]), 6)})
+    return labels
+
+
+class RawScript(Element):
+    """直接输出的脚本片段，不再作为 jinja 模板编译（大数据量时模板编译非常慢）"""
+
+    def __init__(self, script):
+        super().__init__()
+        self.script = script
+
+    def render(self, **kwargs):
+        return self.script
+
+
+class FaultLayer(MacroElement):
+    """断裂带图层：所有断裂带合并为一个 GeoJSON 图层，按缩放级别切换抽稀几何，
+    共用一个 zoomend/moveend 处理函数调整标注字号并剔除相互重叠的标注"""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var names = {{ this.names_json }};
+            var levels = {{ this.levels_json }};
+            var labels = {{ this.labels_json }};
+            var color = {{ this.color|tojson }};
+            var scale = {{ this.scale }};
+
+            // 由扁平数组组装成单个 GeoJSON FeatureCollection
+            function toGeoJSON(level) {
+                var features = [];
+                for (var i = 0; i + 1 < level.offsets.length; i++) {
+                    var coordinates = [];
+                    for (var k = level.offsets[i]; k < level.offsets[i + 1]; k++) {
+                        coordinates.push([level.lon[k] / scale, level.lat[k] / scale]);
+                    }
+                    features.push({type: 'Feature', properties: {name: names[i]},
+                                   geometry: {type: 'LineString', coordinates: coordinates}});
+                }
+                return {type: 'FeatureCollection', features: features};
+            }
+
+            var lineLayer = L.geoJSON(null, {
+                style: {color: color, weight: 3, opacity: 0.8},
+                onEachFeature: function(feature, layer) {
+                    layer.bindPopup(feature.properties.name, {maxWidth: 300});
+                }
+            }).addTo(map);
+            var labelLayer = L.layerGroup().addTo(map);
+            var currentLevel = -1;
+
+            function pickLevel(zoom) {
+                var level = 0;
+                for (var i = 0; i < levels.length; i++) {
+                    if (levels[i].zoom <= zoom) {
+                        level = i;
+                    }
+                }
+                return level;
+            }
+
+            function updateFaults() {
+                var zoom = map.getZoom();
+                var level = pickLevel(zoom);
+                if (level !== currentLevel) {
+                    lineLayer.clearLayers();
+                    lineLayer.addData(levels[level].geojson = levels[level].geojson || toGeoJSON(levels[level]));
+                    currentLevel = level;
+                }
+
+                // 统一调整标注字号，并按屏幕网格剔除重叠标注
+                var fontSize = Math.max(10, zoom * 2);
+                var height = fontSize * 1.4;
+                var cell = height * 4;
+                var bounds = map.getBounds();
+                var occupied = {};
+                labelLayer.clearLayers();
+                labels.forEach(function(label) {
+                    if (!bounds.contains([label.lat, label.lon])) {
+                        return;
+                    }
+                    var p = map.latLngToContainerPoint([label.lat, label.lon]);
+                    var width = label.name.length * fontSize;
+                    var box = [p.x - width / 2, p.y - height / 2, p.x + width / 2, p.y + height / 2];
+                    var keys = [];
+                    for (var cx = Math.floor(box[0] / cell); cx <= Math.floor(box[2] / cell); cx++) {
+                        for (var cy = Math.floor(box[1] / cell); cy <= Math.floor(box[3] / cell); cy++) {
+                            var key = cx + ',' + cy;
+                            var boxes = occupied[key] || [];
+                            for (var k = 0; k < boxes.length; k++) {
+                                var b = boxes[k];
+                                if (box[0] < b[2] && b[0] < box[2] && box[1] < b[3] && b[1] < box[3]) {
+                                    return;
+                                }
+                            }
+                            keys.push(key);
+                        }
+                    }
+                    keys.forEach(function(key) {
+                        (occupied[key] = occupied[key] || []).push(box);
+                    });
+                    labelLayer.addLayer(L.marker([label.lat, label.lon], {
+                        interactive: false,
+                        icon: L.divIcon({
+                            className: '',
+                            iconSize: [width, height],
+                            iconAnchor: [width / 2, height / 2],
+                            html: '<div style="font-size: ' + fontSize + 'px; color: ' + color +
+                                  '; font-weight: bold; text-align: center; white-space: nowrap;">' +
+                                  label.name + '</div>'
+                        })
+                    }));
+                });
+            }
+
+            map.on('zoomend moveend', updateFaults);
+            updateFaults();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, faults, zoom_levels=ZOOM_LEVELS, color='red'):
+        super().__init__()
+        self._name = 'FaultLayer'
+        self.color = color
+        self.scale = COORD_SCALE
+        self.names_json = script_json([html.escape(str(faults.name(i))) for i in range(len(faults))])
+        # 从最细的级别开始抽稀，较粗级别复用其结果
+        levels = {zoom: compact_level(faults.simplified(zoom)) for zoom in sorted(zoom_levels, reverse=True)}
+        self.levels_json = script_json([dict(zoom=zoom, **levels[zoom]) for zoom in sorted(zoom_levels)])
+        self.labels_json = script_json(fault_labels(faults))
+
+    def render(self, **kwargs):
+        figure = self.get_root()
+        figure.script.add_child(RawScript(self._template.module.script(self, kwargs)), name=self.get_name())
@@ -0,0 +1,148 @@
+import math
+import os
+import numpy as np
+
+try:
+    from pyproj import Geod  # 可选：Karney 算法，近对跖点也能精确收敛
+    _WGS84_GEOD = Geod(ellps='WGS84')
+except ImportError:
+    _WGS84_GEOD = None
+
+EARTH_RADIUS = 6371  # 球面模型的地球半径（km）
+KM_PER_DEGREE = math.pi * EARTH_RADIUS / 180  # 球面模型每度纬度对应的距离（km）
+GRID_KM_PER_DEGREE = 111  # 球面模型下台站生成沿用的每度纬度公里数（1度纬度约111公里），保证生成结果不变
+
+# WGS84 椭球参数（m）
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+# 距离模型：球面为默认的快速模式，椭球面用于最小间距等对精度要求高的检查
+MODELS = {'sphere': "球面", 'wgs84': "椭球面（WGS84）"}
+_model = os.environ.get('STATION_GEODESY_MODEL', 'sphere')
+
+
+def set_model(model):
+    """设置全局距离模型，筛选、自检查和台站生成统一使用"""
+    global _model
+    if model not in MODELS:
+        raise ValueError(f"未知的距离模型: {model}")
+    _model = model
+
+
+def get_model():
+    return _model
+
+
+def wrap_longitude(dlon):
+    """经度差归一化到 [-180, 180)，跨 180° 经线的台站对也能正确计算"""
+    return (np.asarray(dlon, dtype=np.float64) + 180.0) % 360.0 - 180.0
+
+
+def equirectangular(lat1, lon1, lat2, lon2):
+    """等距圆柱投影近似距离（km），只用乘加和一次开方，适合小范围内的快速估算"""
+    lat1 = np.radians(np.asarray(lat1, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lat2, dtype=np.float64))
+    dlon = np.radians(wrap_longitude(np.subtract(lon2, lon1)))
+    x = dlon * np.cos((lat1 + lat2) / 2)
+    y = lat2 - lat1
+    return EARTH_RADIUS * np.sqrt(x * x + y * y)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """球面大圆距离（km），与原有的逐个比较 haversine 算法一致"""
+    lat1 = np.radians(np.asarray(lat1, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lat2, dtype=np.float64))
+    dlon = np.radians(np.subtract(lon2, lon1, dtype=np.float64))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def vincenty(lat1, lon1, lat2, lon2, tol=1e-12, max_iter=200):
+    """WGS84 椭球面距离（km），Vincenty 反算公式的向量化实现
+
+    近对跖点的台站对迭代不收敛，改用球面距离代替；一般通过 geodesic() 调用
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (lat1, lon1, lat2, lon2)))
+    L = np.radians(wrap_longitude(lon2 - lon1))
+    U1 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat2)))
+    sin_u1, cos_u1 = np.sin(U1), np.cos(U1)
+    sin_u2, cos_u2 = np.sin(U2), np.cos(U2)
+
+    def terms(lam):
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+        cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+        sigma = np.arctan2(sin_sigma, cos_sigma)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sin_alpha = np.where(sin_sigma > 0, cos_u1 * cos_u2 * sin_lam / sin_sigma, 0.0)
+            cos2_alpha = 1 - sin_alpha ** 2
+            # 赤道上的台站对 cos2_alpha 为 0
+            cos_2sigma_m = np.where(cos2_alpha > 0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha, 0.0)
+        return sin_sigma, cos_sigma, sigma, sin_alpha, cos2_alpha, cos_2sigma_m
+
+    lam = L.copy()
+    active = np.ones(L.shape, dtype=bool)
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        sin_sigma, cos_sigma, sigma, sin_alpha, cos2_alpha, cos_2sigma_m = terms(lam)
+        C = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+        lam_new = L + (1 - C) * WGS84_F * sin_alpha * (
+            sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+        # 已收敛的台站对不再更新
+        lam_new = np.where(active, lam_new, lam)
+        active &= np.abs(lam_new - lam) > tol
+        lam = lam_new
+
+    sin_sigma, cos_sigma, sigma, sin_alpha, cos2_alpha, cos_2sigma_m = terms(lam)
+    u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+        - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+    distance = WGS84_B * A * (sigma - delta_sigma) / 1000
+    if active.any():
+        distance = np.where(active, haversine(lat1, lon1, lat2, lon2), distance)
+    return distance
+
+
+def geodesic(lat1, lon1, lat2, lon2):
+    """WGS84 椭球面距离（km）；安装了 pyproj 时使用 Karney 算法，否则使用 Vincenty 公式"""
+    if _WGS84_GEOD is None:
+        return vincenty(lat1, lon1, lat2, lon2)
+    lat1, lon1, lat2, lon2 = (np.array(v, dtype=np.float64) for v in np.broadcast_arrays(lat1, lon1, lat2, lon2))
+    _, _, meters = _WGS84_GEOD.inv(lon1, lat1, lon2, lat2)
+    return np.asarray(meters) / 1000
+
+
+def distance(lat1, lon1, lat2, lon2, model=None):
+    """按距离模型计算台站对距离（km），model 为空时使用全局设置"""
+    model = model or _model
+    if model == 'wgs84':
+        return geodesic(lat1, lon1, lat2, lon2)
+    if model == 'sphere':
+        return haversine(lat1, lon1, lat2, lon2)
+    raise ValueError(f"未知的距离模型: {model}")
+
+
+def degree_lengths(lat, model=None):
+    """纬度 lat 处每度纬度、每度经度对应的距离（km），用于按公里间隔生成台站网格
+
+    球面模型沿用台站生成原有的 111 km/° 和 111·cos(纬度)，与之前生成的网格逐点一致。
+    """
+    model = model or _model
+    if model == 'sphere':
+        if np.ndim(lat) == 0:
+            return GRID_KM_PER_DEGREE, GRID_KM_PER_DEGREE * math.cos(math.radians(lat))
+        return GRID_KM_PER_DEGREE, GRID_KM_PER_DEGREE * np.cos(np.radians(lat))
+    phi = np.radians(lat)
+    if model == 'wgs84':
+        w = 1 - WGS84_E2 * np.sin(phi) ** 2
+        meridian = WGS84_A * (1 - WGS84_E2) / w ** 1.5  # 子午圈曲率半径
+        prime_vertical = WGS84_A / np.sqrt(w)  # 卯酉圈曲率半径
+        return meridian * math.pi / 180 / 1000, prime_vertical * np.cos(phi) * math.pi / 180 / 1000
+    raise ValueError(f"未知的距离模型: {model}")
@@ -0,0 +1,183 @@
+import json
+import os
+import tempfile
+from io import BytesIO
+import folium
+from PyQt6.QtCore import QObject, QUrl, pyqtSignal, pyqtSlot
+from PyQt6.QtWebChannel import QWebChannel
+
+
+MAX_INLINE_HTML = 2 * 1024 * 1024  # QWebEngineView.setHtml 能显示的内容上限
+
+_map_dir = None  # 本进程的临时地图目录（TemporaryDirectory），进程退出时删除
+_map_files = {}  # id(map_view) -> 当前显示的临时地图文件
+_watched_views = set()  # 已连接 destroyed 信号的地图控件
+
+
+class MarkerBridge(QObject):
+    """网页地图与 Python 之间的拖动事件通道"""
+    marker_moved = pyqtSignal(str, float, float)  # 台站键, 纬度, 经度
+
+    @pyqtSlot(str, float, float)
+    def move(self, key, lat, lon):
+        self.marker_moved.emit(key, lat, lon)
+
+
+def install_bridge(map_view, bridge):
+    """将桥接对象注册到 QWebEngineView 的页面上"""
+    channel = QWebChannel(map_view.page())
+    channel.registerObject("pybridge", bridge)
+    map_view.page().setWebChannel(channel)
+    return channel
+
+
+def bind_drag_events(m, marker_keys, container=None):
+    """为地图上的可拖动标记统一绑定 dragend 事件，并注册 window.stationMarkers 供增量更新
+
+    marker_keys: {folium 标记变量名: 台站键}，拖动结束后通过 pybridge 回传新坐标
+    container: 标记所在的图层（如 MarkerCluster），为空时标记直接添加在地图上
+    """
+    m.get_root().header.add_child(folium.JavascriptLink("qrc:///qtwebchannel/qwebchannel.js"))
+    container_name = container.get_name() if container is not None else m.get_name()
+    m.get_root().html.add_child(folium.Element(f"""
+        <script>
+            window.addEventListener('load', function() {{
+                var markerKeys = {json.dumps(marker_keys, ensure_ascii=False)};
+                var container = window[{json.dumps(container_name)}];
+                var clustered = container !== window[{json.dumps(m.get_name())}];
+                var markers = {{}};
+                var bridge = null;
+
+                function bindDrag(marker, key) {{
+                    marker.on('dragend', function(e) {{
+                        var pos = e.target.getLatLng();
+                        if (bridge) {{
+                            bridge.move(key, pos.lat, pos.lng);
+                        }}
+                    }});
+                }}
+
+                Object.keys(markerKeys).forEach(function(name) {{
+                    var marker = window[name];
+                    if (!marker) {{
+                        return;
+                    }}
+                    markers[markerKeys[name]] = marker;
+                    bindDrag(marker, markerKeys[name]);
+                }});
+
+                // 撤销/重做等编辑只移动、增删变化的标记，不重新生成整个地图
+                window.stationMarkers = {{
+                    move: function(items) {{
+                        items.forEach(function(item) {{
+                            var marker = markers[item[0]];
+                            if (!marker) {{
+                                return;
+                            }}
+                            if (clustered) {{
+                                container.removeLayer(marker);
+                                marker.setLatLng([item[1], item[2]]);
+                                container.addLayer(marker);
+                            }} else {{
+                                marker.setLatLng([item[1], item[2]]);
+                            }}
+                        }});
+                    }},
+                    remove: function(keys) {{
+                        keys.forEach(function(key) {{
+                            if (markers[key]) {{
+                                container.removeLayer(markers[key]);
+                                delete markers[key];
+                            }}
+                        }});
+                    }},
+                    add: function(items, style) {{
+                        items.forEach(function(item) {{
+                            var options = {{draggable: true}};
+                            if (style && L.AwesomeMarkers) {{
+                                options.icon = L.AwesomeMarkers.icon({{
+                                    icon: style.icon, markerColor: style.color, prefix: 'glyphicon', iconColor: 'white'
+                                }});
+                            }}
+                            var marker = L.marker([item[1], item[2]], options);
+                            if (item[3]) {{
+                                marker.bindPopup(item[3]);
+                            }}
+                            container.addLayer(marker);
+                            markers[item[0]] = marker;
+                            bindDrag(marker, item[0]);
+                        }});
+                    }}
+                }};
+
+                new QWebChannel(qt.webChannelTransport, function(channel) {{
+                    bridge = channel.objects.pybridge;
+                }});
+            }});
+        </script>
+    """))
+
+
+def _run_marker_script(map_view, action, *args):
+    script = f"window.stationMarkers && window.stationMarkers.{action}(" + \
+             ", ".join(json.dumps(arg, ensure_ascii=False) for arg in args) + ");"
+    map_view.page().runJavaScript(script)
+
+
+def move_markers(map_view, items):
+    """移动地图上的标记，items: [(台站键, 纬度, 经度)]"""
+    items = [[str(key), float(lat), float(lon)] for key, lat, lon in items]
+    if items:
+        _run_marker_script(map_view, 'move', items)
+
+
+def remove_markers(map_view, keys):
+    keys = [str(key) for key in keys]
+    if keys:
+        _run_marker_script(map_view, 'remove', keys)
+
+
+def add_markers(map_view, items, color=None, icon=None):
+    """添加可拖动标记，items: [(台站键, 纬度, 经度, 弹窗文字)]"""
+    items = [[str(key), float(lat), float(lon), str(popup)] for key, lat, lon, popup in items]
+    if items:
+        _run_marker_script(map_view, 'add', items, {'color': color, 'icon': icon} if icon else None)
+
+
+def show_map(map_view, m):
+    """渲染 folium 地图并显示；超过 setHtml 上限（如大型断裂带数据）时写入临时文件再加载"""
+    data = BytesIO()
+    m.save(data, close_file=False)
+    html = data.getvalue()
+    old_file = _map_files.pop(id(map_view), None)
+    if len(html) < MAX_INLINE_HTML:
+        map_view.setHtml(html.decode())
+    else:
+        global _map_dir
+        if _map_dir is None:
+            _map_dir = tempfile.TemporaryDirectory(prefix="station_map_")
+        with tempfile.NamedTemporaryFile('wb', suffix='.html', dir=_map_dir.name, delete=False) as f:
+            f.write(html)
+        key = id(map_view)
+        if key not in _watched_views:
+            # 地图控件销毁（窗口关闭）时删除其临时文件
+            _watched_views.add(key)
+            map_view.destroyed.connect(lambda *_: _forget_view(key))
+        _map_files[key] = f.name
+        map_view.load(QUrl.fromLocalFile(f.name))
+    # 新地图已替换旧页面，删除上一次的临时文件
+    _remove_map_file(old_file)
+
+
+def _forget_view(key):
+    _watched_views.discard(key)
+    _remove_map_file(_map_files.pop(key, None))
+
+
+def _remove_map_file(file_path):
+    if file_path is None:
+        return
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
@@ -0,0 +1,291 @@
+import argparse
+import itertools
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from shapely.geometry import Point
+from distance_filter import nearest_within, pairs_within
+from geodesy import EARTH_RADIUS, degree_lengths, get_model, set_model
+from scenario_sweep import Scenario, run_scenarios
+from spatial_index import StaticIndex, close_pairs
+from station_grid import region_polygon, generate_grid
+from station_service import _init_worker, _self_check
+from station_store import StationStore
+
+SIZES = (200, 2000)  # 小规模 / 中等规模；暴力算法为 O(n²)，中等规模约需数秒
+TOLERANCE_KM = 1e-6  # 距离允许偏差；与筛选半径相差不超过该值的台站对视为边界情况，两种结果均可接受
+NEAREST_RADIUS = 20  # 最近站筛选半径（km）
+PAIR_RADIUS = 10  # 台站自检查半径（km）
+CHECK_COLUMNS = ["检查", "实现", "规模", "参考结果数", "实现结果数", "最大偏差(km)", "一致"]
+
+# 台站生成区域：普通四边形、高纬度区域、顶点顺序打乱的斜四边形
+REGIONS = {
+    '普通区域': [(30, 100), (32, 100), (32, 103), (30, 103)],
+    '高纬度区域': [(80, 10), (84, 10), (84, 40), (80, 40)],
+    '斜四边形': [(20, 110), (22, 115), (23, 111), (19, 113)],
+}
+
+
+# ========== 确定性合成数据 ==========
+def synthetic_stations(n, seed=0, prefix="S"):
+    """生成 n 个确定性的合成台站
+
+    约 55% 分布在中国区域，15% 为密集簇（产生大量相近台站对），10% 跨越 180° 经线，10% 靠近两极，
+    其余为重复台站：坐标和名称都相同、坐标相同但名称不同、名称相同但坐标不同三种情况各占约三分之一。
+    """
+    rng = np.random.default_rng(seed)
+    counts = np.array([0.55, 0.15, 0.10, 0.10]) * n
+    regional, clustered, antimeridian, polar = counts.astype(int)
+    duplicates = n - regional - clustered - antimeridian - polar
+
+    lat = [rng.uniform(20, 40, regional)]
+    lon = [rng.uniform(100, 120, regional)]
+    centers = rng.integers(0, max(regional, 1), max(clustered // 10, 1))
+    cluster_of = rng.choice(centers, clustered) if regional else np.zeros(clustered, dtype=int)
+    lat.append((lat[0][cluster_of] if regional else 30) + rng.normal(0, 0.02, clustered))
+    lon.append((lon[0][cluster_of] if regional else 110) + rng.normal(0, 0.02, clustered))
+    lat.append(rng.uniform(-10, 10, antimeridian))
+    lon.append((180 + rng.uniform(-0.5, 0.5, antimeridian) + 180) % 360 - 180)
+    lat.append(np.where(rng.random(polar) < 0.5, 1, -1) * rng.uniform(89.5, 90, polar))
+    lon.append(rng.uniform(-180, 180, polar))
+    lat, lon = np.concatenate(lat), np.concatenate(lon)
+    names = [f"{prefix}{i + 1}" for i in range(len(lat))]
+
+    # 重复台站复制已有台站的坐标或名称
+    source = rng.integers(0, len(lat), duplicates) if len(lat) else np.zeros(duplicates, dtype=int)
+    kind = np.arange(duplicates) % 3
+    jitter = np.where(kind == 2, 0.01, 0.0)
+    dup_lat = np.clip(lat[source] + jitter, -90, 90) if len(lat) else np.zeros(duplicates)
+    dup_lon = lon[source] + jitter if len(lat) else np.zeros(duplicates)
+    dup_lon = np.where(dup_lon >= 180, dup_lon - 360, dup_lon)  # 只处理越过 180° 的台站，完全重复的坐标保持不变
+    dup_names = [f"{prefix}{len(lat) + k + 1}" if kind[k] == 1 else names[s] for k, s in enumerate(source.tolist())]
+    return StationStore(np.concatenate([lat, dup_lat]), np.concatenate([lon, dup_lon]), names + dup_names)
+
+
+def grid_interval(region, n):
+    """使区域内生成约 n 个台站的间隔（km）"""
+    polygon = region_polygon(region)
+    km_per_lat, km_per_lon = degree_lengths(polygon.bounds[0])
+    return math.sqrt(polygon.area * km_per_lat * km_per_lon / n)
+
+
+# ========== 参考实现（与原始逐个比较的算法一致） ==========
+def reference_haversine(lat1, lon1, lat2, lon2):
+    """原 EarthquakeApp.haversine_distance / DistanceCalculator.haversine_distance"""
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = math.sin(dlat / 2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2)**2
+    c = 2 * math.asin(math.sqrt(a))
+    return EARTH_RADIUS * c
+
+
+def reference_nearest(queries, stations, max_distance):
+    """原 EarthquakeApp.find_closest_station 逐个比较，返回筛选出的 (查询行号, 台站行号, 距离)"""
+    results = []
+    station_rows = list(zip(stations.lat.tolist(), stations.lon.tolist()))
+    for q, (lat, lon) in enumerate(zip(queries.lat.tolist(), queries.lon.tolist())):
+        min_distance, closest = float('inf'), -1
+        for s, (s_lat, s_lon) in enumerate(station_rows):
+            distance = reference_haversine(lat, lon, s_lat, s_lon)
+            if distance < min_distance:
+                min_distance, closest = distance, s
+        if min_distance <= max_distance:
+            results.append((q, closest, min_distance))
+    return results
+
+
+def reference_pairs(stations, max_distance):
+    """StationDistanceWidget.filter_data 的 combinations 循环，返回 (i, j, 距离)"""
+    names = stations.names
+    lat, lon = stations.lat.tolist(), stations.lon.tolist()
+    results = []
+    for i, j in itertools.combinations(range(len(lat)), 2):
+        if names[i] != names[j]:  # 站点名称不相等时才筛选
+            distance = reference_haversine(lat[i], lon[i], lat[j], lon[j])
+            if distance <= max_distance:
+                results.append((i, j, distance))
+    return results
+
+
+def reference_grid(region, interval):
+    """StationApp.create_grid 原有的逐点判断（固定按 1 度纬度约 111 公里换算），返回 [(纬度, 经度)]"""
+    polygon = region_polygon(region)
+    lat_min, lon_min, lat_max, lon_max = polygon.bounds
+    lat_step = interval / 111  # 1度纬度约111公里
+    lon_step = interval / (111 * math.cos(math.radians(lat_min)))
+    lat_values = np.arange(lat_min, lat_max, lat_step)
+    lon_values = np.arange(lon_min, lon_max, lon_step)
+    stations = []
+    for lat in lat_values:
+        for lon in lon_values:
+            if polygon.contains(Point(lat, lon)):
+                stations.append((lat, lon))
+    return stations
+
+
+# ========== 加速实现 ==========
+def static_index_nearest(queries, stations, max_distance):
+    nearest, distances = StaticIndex(stations.lat, stations.lon).nearest_many(queries.lat, queries.lon)
+    rows = np.flatnonzero(distances <= max_distance)
+    return list(zip(rows.tolist(), nearest[rows].tolist(), distances[rows].tolist()))
+
+
+def filter_nearest(queries, stations, max_distance):
+    nearest, distances = nearest_within(queries.lat, queries.lon, stations.lat, stations.lon, max_distance, 'sphere')
+    rows = np.flatnonzero(nearest >= 0)
+    return list(zip(rows.tolist(), nearest[rows].tolist(), distances[rows].tolist()))
+
+
+def _named_pairs(stations, i, j, d):
+    keep = stations.name_codes[i] != stations.name_codes[j]
+    return list(zip(i[keep].tolist(), j[keep].tolist(), d[keep].tolist()))
+
+
+def filter_pairs(stations, max_distance):
+    return _named_pairs(stations, *pairs_within(stations.lat, stations.lon, max_distance, 'sphere'))
+
+
+def kdtree_pairs(stations, max_distance):
+    return _named_pairs(stations, *close_pairs(stations.lat, stations.lon, max_distance))
+
+
+def service_pairs(stations, max_distance, max_workers=2):
+    """本地服务的自检查任务，在与服务相同的 spawn 进程池中执行（耗时包含进程池启动）"""
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=({}, 'sphere')) as pool:
+        i, j, d = pool.submit(_self_check, stations.lat, stations.lon, stations.name_codes, max_distance).result()
+    return list(zip(i.tolist(), j.tolist(), d.tolist()))
+
+
+def vectorized_grid(region, interval):
+    grid = generate_grid(region_polygon(region), interval)
+    return list(zip(grid.lat.tolist(), grid.lon.tolist()))
+
+
+def reference_scenarios(regions, existing, n):
+    """逐个场景执行原始的生成和最近站筛选，返回 [(生成台站数, 冲突台站数)]"""
+    rows = []
+    for region in regions.values():
+        grid = reference_grid(region, grid_interval(region, n))
+        grid = StationStore.from_points(grid)
+        rows.append((len(grid), len(reference_nearest(grid, existing, NEAREST_RADIUS))))
+    return rows
+
+
+def parallel_scenarios(regions, existing, n, max_workers=2):
+    scenarios = [Scenario(name, region, grid_interval(region, n), radius=NEAREST_RADIUS)
+                 for name, region in regions.items()]
+    summary = run_scenarios(scenarios, existing, max_workers)
+    return list(zip(summary["生成台站数"].tolist(), summary["冲突台站数"].tolist()))
+
+
+# ========== 结果比较 ==========
+def compare_nearest(reference, result, stations, max_distance):
+    """查询点集合须一致；最近台站相同，或坐标完全重复的台站（距离相同）"""
+    expected = {q: (s, d) for q, s, d in reference}
+    actual = {q: (s, d) for q, s, d in result}
+    deviation, ok = 0.0, True
+    for q in expected.keys() | actual.keys():
+        if q not in expected or q not in actual:
+            d = (expected.get(q) or actual.get(q))[1]
+            ok &= abs(d - max_distance) <= TOLERANCE_KM
+            continue
+        (s1, d1), (s2, d2) = expected[q], actual[q]
+        deviation = max(deviation, abs(d1 - d2))
+        same = s1 == s2 or (stations.lat[s1] == stations.lat[s2] and stations.lon[s1] == stations.lon[s2])
+        ok &= same and abs(d1 - d2) <= TOLERANCE_KM
+    return deviation, bool(ok)
+
+
+def compare_pairs(reference, result, max_distance):
+    expected = {(i, j): d for i, j, d in reference}
+    actual = {(i, j): d for i, j, d in result}
+    deviation, ok = 0.0, len(actual) == len(result)  # 不得有重复台站对
+    for pair in expected.keys() | actual.keys():
+        if pair not in expected or pair not in actual:
+            d = expected.get(pair, actual.get(pair))
+            ok &= abs(d - max_distance) <= TOLERANCE_KM
+            continue
+        deviation = max(deviation, abs(expected[pair] - actual[pair]))
+    return deviation, bool(ok and deviation <= TOLERANCE_KM)
+
+
+def compare_exact(reference, result):
+    return 0.0, list(reference) == list(result)
+
+
+@dataclass
+class OracleCase:
+    """一组参考实现与加速实现的比较"""
+    check: str
+    size: int
+    reference: object  # 无参数函数，返回参考结果
+    engines: list  # [(实现名称, 无参数函数)]
+    compare: object  # compare(参考结果, 实现结果) -> (最大偏差, 是否一致)
+
+
+def oracle_cases(n, seed=0):
+    """规模为 n 的全部比较项，数据由 seed 确定"""
+    existing = synthetic_stations(n, seed, prefix="Y")
+    queries = synthetic_stations(n, seed + 1, prefix="P")
+    cases = [
+        OracleCase("最近站筛选", n, lambda: reference_nearest(queries, existing, NEAREST_RADIUS), [
+            ("StaticIndex", lambda: static_index_nearest(queries, existing, NEAREST_RADIUS)),
+            ("nearest_within", lambda: filter_nearest(queries, existing, NEAREST_RADIUS)),
+        ], lambda ref, res: compare_nearest(ref, res, existing, NEAREST_RADIUS)),
+        OracleCase("台站自检查", n, lambda: reference_pairs(existing, PAIR_RADIUS), [
+            ("pairs_within", lambda: filter_pairs(existing, PAIR_RADIUS)),
+            ("close_pairs", lambda: kdtree_pairs(existing, PAIR_RADIUS)),
+            ("服务进程池", lambda: service_pairs(existing, PAIR_RADIUS)),
+        ], lambda ref, res: compare_pairs(ref, res, PAIR_RADIUS)),
+        OracleCase("批量场景", n, lambda: reference_scenarios(REGIONS, existing, n), [
+            ("scenario_sweep 进程池", lambda: parallel_scenarios(REGIONS, existing, n)),
+        ], compare_exact),
+    ]
+    for name, region in REGIONS.items():
+        args = (region, grid_interval(region, n))
+        cases.append(OracleCase(f"台站生成（{name}）", n, lambda args=args: reference_grid(*args), [
+            ("generate_grid", lambda args=args: vectorized_grid(*args)),
+        ], compare_exact))
+    return cases
+
+
+def run_cases(cases, timer=None):
+    """执行比较项；timer(func) 返回 (耗时s, 结果)，为空时不计时"""
+    timer = timer or (lambda func: (None, func()))
+    rows = []
+    previous = get_model()
+    set_model('sphere')  # 原始算法均为球面 haversine
+    try:
+        for case in cases:
+            seconds, reference = timer(case.reference)
+            for label, engine in case.engines:
+                engine_seconds, result = timer(engine)
+                deviation, ok = case.compare(reference, result)
+                rows.append(([case.check, label, case.size, len(reference), len(result), deviation, ok],
+                             seconds, engine_seconds))
+    finally:
+        set_model(previous)
+    return rows
+
+
+def run_checks(sizes=SIZES, seed=0):
+    """运行全部比较，返回结果表"""
+    rows = [row for n in sizes for row, _, _ in run_cases(oracle_cases(n, seed))]
+    return pd.DataFrame(rows, columns=CHECK_COLUMNS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="用原始逐个比较算法校验索引、向量化和并行实现的结果")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES), help="合成台站数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    table = run_checks(args.sizes, args.seed)
+    print(table.to_string(index=False))
+    if not table["一致"].all():
+        raise SystemExit("存在与参考实现不一致的结果")
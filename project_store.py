@@ -0,0 +1,161 @@
+import hashlib
+import json
+import sqlite3
+import numpy as np
+from station_store import StationStore
+from fault_io import FaultSet
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalogues (
+    key TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    names TEXT NOT NULL,
+    lat BLOB NOT NULL,
+    lon BLOB NOT NULL,
+    ids BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS faults (
+    key TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    meta TEXT NOT NULL,
+    lat BLOB NOT NULL,
+    lon BLOB NOT NULL,
+    offsets BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    name TEXT PRIMARY KEY,
+    input_hash TEXT NOT NULL,
+    params TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    lat BLOB,
+    lon BLOB,
+    ids BLOB
+);
+"""
+STAGE_COLUMNS = ('name', 'input_hash', 'params', 'kind', 'payload', 'lat', 'lon', 'ids')
+
+
+def content_hash(*parts):
+    """计算输入内容的哈希，支持 StationStore/视图、numpy 数组、断裂带列表和普通参数"""
+    h = hashlib.sha1()
+    for part in parts:
+        if part is None:
+            h.update(b'<none>')
+        elif hasattr(part, 'name_codes'):
+            h.update(np.ascontiguousarray(part.lat).tobytes())
+            h.update(np.ascontiguousarray(part.lon).tobytes())
+            h.update('\x1f'.join(map(str, part.names)).encode('utf-8'))
+        elif isinstance(part, np.ndarray):
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(json.dumps(part, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8'))
+        h.update(b'\x1e')
+    return h.hexdigest()
+
+
+class ProjectStore:
+    """工程文件（SQLite）：保存台站目录、断裂带、生成网格和各阶段结果
+
+    每个阶段结果都记录输入内容哈希，重新打开工程时只有输入发生变化的阶段需要重算。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        columns = tuple(row[1] for row in self.conn.execute("PRAGMA table_info(stages)"))
+        if columns and columns != STAGE_COLUMNS:
+            # 旧格式的阶段缓存（序列化对象）不再读取，直接丢弃后重算
+            self.conn.execute("DROP TABLE stages")
+        self.conn.executescript(SCHEMA)
+        try:
+            # 早期版本写入的台站 R*Tree 索引没有使用者，打开时删除
+            self.conn.execute("DROP TABLE IF EXISTS station_rtree")
+        except sqlite3.OperationalError:
+            pass  # SQLite 不含 R*Tree 模块时无法删除该虚表，保留不影响读写
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def clear(self):
+        """清空工程内容（新建工程覆盖已有文件时使用）"""
+        with self.conn:
+            for table in ('catalogues', 'faults', 'stages'):
+                self.conn.execute(f"DELETE FROM {table}")
+
+    # ========== 台站目录 ==========
+    def save_stations(self, key, stations):
+        digest = content_hash(stations)
+        row = self.conn.execute("SELECT content_hash FROM catalogues WHERE key = ?", (key,)).fetchone()
+        if row is not None and row[0] == digest:
+            return digest
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO catalogues VALUES (?, ?, ?, ?, ?, ?)",
+                (key, digest, json.dumps(list(map(str, stations.names)), ensure_ascii=False),
+                 np.ascontiguousarray(stations.lat).tobytes(), np.ascontiguousarray(stations.lon).tobytes(),
+                 np.ascontiguousarray(stations.ids).tobytes()))
+        return digest
+
+    def load_stations(self, key):
+        row = self.conn.execute("SELECT names, lat, lon, ids FROM catalogues WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        names, lat, lon, ids = row
+        return StationStore(np.frombuffer(lat, dtype=np.float64).copy(), np.frombuffer(lon, dtype=np.float64).copy(),
+                            json.loads(names), ids=np.frombuffer(ids, dtype=np.int64).copy())
+
+    def delete_stations(self, key):
+        with self.conn:
+            self.conn.execute("DELETE FROM catalogues WHERE key = ?", (key,))
+
+    # ========== 断裂带 ==========
+    def save_faults(self, key, faults):
+        """faults: FaultSet，保存扁平坐标、分段偏移和段头元数据"""
+        digest = content_hash(faults.lat, faults.lon, faults.offsets, faults.meta)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO faults VALUES (?, ?, ?, ?, ?, ?)",
+                (key, digest, json.dumps(faults.meta, ensure_ascii=False, default=str),
+                 faults.lat.tobytes(), faults.lon.tobytes(), faults.offsets.tobytes()))
+        return digest
+
+    def load_faults(self, key):
+        row = self.conn.execute("SELECT meta, lat, lon, offsets FROM faults WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return FaultSet.empty()
+        meta, lat, lon, offsets = row
+        return FaultSet(np.frombuffer(lat, dtype=np.float64).copy(), np.frombuffer(lon, dtype=np.float64).copy(),
+                        np.frombuffer(offsets, dtype=np.int64).copy(), json.loads(meta))
+
+    # ========== 阶段结果 ==========
+    def save_stage(self, name, input_hash, params, payload):
+        """payload 为台站集合（按坐标数组保存）或可 JSON 序列化的列表/字典，不保存任意对象"""
+        if hasattr(payload, 'name_codes'):
+            row = ('stations', json.dumps(list(map(str, payload.names)), ensure_ascii=False),
+                   np.ascontiguousarray(payload.lat).tobytes(), np.ascontiguousarray(payload.lon).tobytes(),
+                   np.ascontiguousarray(payload.ids).tobytes())
+        else:
+            row = ('json', json.dumps(payload, ensure_ascii=False), None, None, None)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, input_hash, json.dumps(params, ensure_ascii=False, default=str)) + row)
+
+    def stage_params(self, name):
+        row = self.conn.execute("SELECT params FROM stages WHERE name = ?", (name,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def load_stage(self, name, input_hash):
+        """输入哈希一致时返回缓存结果，否则返回 None（需要重算）"""
+        row = self.conn.execute("SELECT input_hash, kind, payload, lat, lon, ids FROM stages WHERE name = ?",
+                                (name,)).fetchone()
+        if row is None or row[0] != input_hash:
+            return None
+        _, kind, payload, lat, lon, ids = row
+        if kind == 'stations':
+            return StationStore(np.frombuffer(lat, dtype=np.float64).copy(),
+                                np.frombuffer(lon, dtype=np.float64).copy(),
+                                json.loads(payload), ids=np.frombuffer(ids, dtype=np.int64).copy())
+        return json.loads(payload)
@@ -0,0 +1,116 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from distance_filter import nearest_within
+from geodesy import get_model, set_model
+from spatial_index import StaticIndex
+from station_grid import region_polygon, generate_grid
+from station_store import StationStore
+
+SUMMARY_COLUMNS = ["场景", "布局", "间隔(km)", "筛选半径(km)", "生成台站数", "冲突台站数", "保留台站数", "覆盖率"]
+
+# 每个工作进程只构建一次已建设台站索引，供该进程处理的所有场景复用
+_existing = None  # (纬度数组, 经度数组, StaticIndex)
+
+
+@dataclass
+class Scenario:
+    """一个批量参数研究场景"""
+    name: str
+    region: list  # 区域顶点 [(纬度, 经度)]
+    interval: float  # 生成台站间隔（km）
+    layout: str = 'square'
+    radius: float = 5  # 与已建设台站的筛选半径（km）
+    coverage_radius: float = None  # 覆盖半径（km），默认等于生成间隔
+
+
+def _init_worker(existing_lat, existing_lon, model):
+    global _existing
+    set_model(model)  # 工作进程使用与主进程相同的距离模型
+    _existing = (existing_lat, existing_lon, StaticIndex(existing_lat, existing_lon))
+
+
+def coverage_ratio(polygon, lat, lon, radius, step):
+    """区域内采样点到最近台站不超过 radius 的比例"""
+    samples = generate_grid(polygon, step)
+    index = StaticIndex(lat, lon)
+    _, distances = index.nearest_many(samples.lat, samples.lon)
+    return float(np.mean(distances <= radius))
+
+
+def run_scenario(scenario):
+    """生成网格 → 与已建设台站筛选 → 统计覆盖率，返回汇总行"""
+    polygon = region_polygon(scenario.region)
+    grid = generate_grid(polygon, scenario.interval, scenario.layout)
+    existing_lat, existing_lon, existing_index = _existing
+    if get_model() == 'sphere':
+        _, distances = existing_index.nearest_many(grid.lat, grid.lon)
+        conflicts = distances <= scenario.radius
+    else:
+        # 椭球面模型与台站筛选模块一致，按该模型的精确距离判断半径内是否有已建设台站
+        nearest, _ = nearest_within(grid.lat, grid.lon, existing_lat, existing_lon, scenario.radius, get_model())
+        conflicts = nearest >= 0
+    kept = grid.view(~conflicts)
+
+    # 覆盖率按已建设台站 + 保留的新台站计算
+    lat = np.concatenate([existing_lat, kept.lat])
+    lon = np.concatenate([existing_lon, kept.lon])
+    coverage_radius = scenario.coverage_radius or scenario.interval
+    coverage = coverage_ratio(polygon, lat, lon, coverage_radius, scenario.interval / 4)
+
+    return [scenario.name, scenario.layout, scenario.interval, scenario.radius,
+            len(grid), int(conflicts.sum()), len(kept), round(coverage, 4)]
+
+
+def run_scenarios(scenarios, existing, max_workers=None):
+    """并行运行多个场景，existing 为已建设台站（StationStore 或其列表），返回汇总表"""
+    if isinstance(existing, (list, tuple)):
+        lat = np.concatenate([stations.lat for stations in existing]) if existing else np.empty(0)
+        lon = np.concatenate([stations.lon for stations in existing]) if existing else np.empty(0)
+    else:
+        lat, lon = existing.lat, existing.lon
+
+    max_workers = max_workers or os.cpu_count()
+    if max_workers <= 1 or len(scenarios) <= 1:
+        _init_worker(lat, lon, get_model())
+        rows = [run_scenario(scenario) for scenario in scenarios]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(lat, lon, get_model())) as pool:
+            rows = list(pool.map(run_scenario, scenarios))
+    return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+
+def load_scenarios(file_path):
+    """读取场景表：场景, 顶点(“纬度 经度; 纬度 经度; ...”), 间隔(km), 布局, 筛选半径(km)
+
+    布局、筛选半径留空时使用 Scenario 的默认值；间隔留空时报错。
+    """
+    df = pd.read_excel(file_path)
+    scenarios = []
+    for row in df.itertuples(index=False):
+        name = str(row[0])
+        region = [tuple(map(float, point.split())) for point in str(row[1]).split(';') if point.strip()]
+        if pd.isna(row[2]):
+            raise ValueError(f"场景 {name} 缺少生成间隔")
+        layout = row[3] if len(row) > 3 and isinstance(row[3], str) else Scenario.layout
+        radius = float(row[4]) if len(row) > 4 and not pd.isna(row[4]) else Scenario.radius
+        scenarios.append(Scenario(name, region, float(row[2]), layout, radius))
+    return scenarios
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="台站布设批量场景研究")
+    parser.add_argument("scenarios", help="场景表（xlsx）")
+    parser.add_argument("output", help="汇总结果（xlsx）")
+    parser.add_argument("--stations", nargs="+", default=[], help="已建设台站文件（xlsx）")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数")
+    args = parser.parse_args()
+
+    existing = [StationStore.read_excel(path) for path in args.stations]
+    summary = run_scenarios(load_scenarios(args.scenarios), existing, args.workers)
+    summary.to_excel(args.output, index=False)
+    print(summary.to_string(index=False))
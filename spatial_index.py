@@ -0,0 +1,132 @@
+import math
+import numpy as np
+from scipy.spatial import cKDTree
+from geodesy import EARTH_RADIUS
+
+
+def to_unit_xyz(lats, lons):
+    """经纬度转单位球面三维坐标，避免极区和180°经线处的坐标跳变"""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def from_unit_xyz(xyz):
+    """三维坐标（无需归一化）转经纬度，返回 (纬度, 经度)"""
+    xyz = np.asarray(xyz, dtype=np.float64)
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    return np.degrees(np.arctan2(z, np.hypot(x, y))), np.degrees(np.arctan2(y, x))
+
+
+def km_to_chord(distance_km):
+    """球面距离（km）转单位球弦长"""
+    angle = min(float(distance_km) / EARTH_RADIUS, math.pi)
+    return 2 * math.sin(angle / 2)
+
+
+def chord_to_km(chord):
+    """单位球弦长转球面距离（km），与 haversine 结果一致"""
+    chord = np.clip(np.asarray(chord, dtype=np.float64), 0.0, 2.0)
+    return 2 * EARTH_RADIUS * np.arcsin(chord / 2)
+
+
+class StaticIndex:
+    """静态台站索引（KD 树），用于查询最近的已建设台站"""
+
+    def __init__(self, lats, lons):
+        self.size = len(lats)
+        self.tree = cKDTree(to_unit_xyz(lats, lons)) if self.size else None
+
+    def nearest(self, lat, lon):
+        """返回 (台站行号, 距离km)；索引为空时返回 (-1, inf)"""
+        if self.tree is None:
+            return -1, float('inf')
+        chord, idx = self.tree.query(to_unit_xyz(lat, lon))
+        return int(idx), float(chord_to_km(chord))
+
+    def nearest_many(self, lats, lons):
+        if self.tree is None:
+            n = len(lats)
+            return np.full(n, -1, dtype=np.int64), np.full(n, np.inf)
+        chord, idx = self.tree.query(to_unit_xyz(lats, lons))
+        return np.asarray(idx, dtype=np.int64), chord_to_km(chord)
+
+
+class DynamicIndex:
+    """可增量更新的三维体素哈希索引，台站拖动后只需重新归桶该台站"""
+
+    def __init__(self, lats, lons, radius_km):
+        self.xyz = to_unit_xyz(lats, lons).reshape(-1, 3)
+        # 体素边长不小于查询弦长，半径查询只需检查相邻 27 个体素
+        self.cell = max(km_to_chord(radius_km), 1e-6)
+        self.radius_km = radius_km
+        self.buckets = {}
+        self.keys = []
+        for i, key in enumerate(map(self._key, self.xyz)):
+            self.keys.append(key)
+            self.buckets.setdefault(key, []).append(i)
+
+    def _key(self, p):
+        return (int(math.floor(p[0] / self.cell)),
+                int(math.floor(p[1] / self.cell)),
+                int(math.floor(p[2] / self.cell)))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def move(self, i, lat, lon):
+        """更新第 i 个台站的位置"""
+        self.xyz[i] = to_unit_xyz(lat, lon)
+        new_key = self._key(self.xyz[i])
+        old_key = self.keys[i]
+        if new_key != old_key:
+            bucket = self.buckets[old_key]
+            bucket.remove(i)
+            if not bucket:
+                del self.buckets[old_key]
+            self.buckets.setdefault(new_key, []).append(i)
+            self.keys[i] = new_key
+
+    def query_radius(self, lat, lon, radius_km=None, exclude=None):
+        """返回距离不超过 radius_km 的台站行号数组及对应距离（km）"""
+        radius_km = self.radius_km if radius_km is None else radius_km
+        p = to_unit_xyz(lat, lon)
+        return self._query_point(p, km_to_chord(radius_km), exclude)
+
+    def neighbors(self, i, radius_km=None):
+        """返回与第 i 个台站距离不超过 radius_km 的其他台站"""
+        radius_km = self.radius_km if radius_km is None else radius_km
+        return self._query_point(self.xyz[i], km_to_chord(radius_km), exclude=i)
+
+    def _query_point(self, p, chord, exclude):
+        reach = int(math.ceil(chord / self.cell))
+        cx, cy, cz = self._key(p)
+        candidates = []
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                for dz in range(-reach, reach + 1):
+                    bucket = self.buckets.get((cx + dx, cy + dy, cz + dz))
+                    if bucket:
+                        candidates.extend(bucket)
+        if exclude is not None and exclude in candidates:
+            candidates.remove(exclude)
+        if not candidates:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        candidates = np.asarray(candidates, dtype=np.int64)
+        chords = np.linalg.norm(self.xyz[candidates] - p, axis=1)
+        keep = chords <= chord
+        return candidates[keep], chord_to_km(chords[keep])
+
+
+def close_pairs(lats, lons, radius_km):
+    """返回球面距离不超过 radius_km 的所有台站对 (i, j, 距离km)，i < j"""
+    xyz = to_unit_xyz(lats, lons).reshape(-1, 3)
+    if len(xyz) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    pairs = cKDTree(xyz).query_pairs(km_to_chord(radius_km), output_type='ndarray')
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    i, j = pairs[:, 0].astype(np.int64), pairs[:, 1].astype(np.int64)
+    distances = chord_to_km(np.linalg.norm(xyz[i] - xyz[j], axis=1))
+    keep = distances <= radius_km
+    return i[keep], j[keep], distances[keep]
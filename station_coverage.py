@@ -0,0 +1,107 @@
+import math
+from dataclasses import dataclass
+import folium
+import numpy as np
+import shapely
+from folium.plugins import HeatMap
+from scipy.spatial import cKDTree
+from shapely.geometry import box, mapping
+from shapely.ops import transform
+from geodesy import KM_PER_DEGREE
+from spatial_index import km_to_chord, chord_to_km, to_unit_xyz
+
+
+@dataclass
+class CoverageResult:
+    """覆盖分析结果，栅格按 (行=纬度, 列=经度) 排列，多边形坐标为 (纬度, 经度)"""
+    lat: np.ndarray  # 各行中心纬度
+    lon: np.ndarray  # 各列中心经度
+    distance: np.ndarray  # 栅格中心到最近台站的距离（km），区域外为 nan，超过 4 倍半径为 inf
+    radius: float
+    total_area: float  # 区域面积（km²）
+    uncovered_area: float  # 未覆盖面积（km²）
+    gaps: list  # 未覆盖区域多边形，按面积降序
+
+    @property
+    def coverage_ratio(self):
+        return 1 - self.uncovered_area / self.total_area if self.total_area else 0.0
+
+    def uncovered_cells(self):
+        """未覆盖栅格中心 (纬度, 经度, 超出半径的距离km)"""
+        rows, cols = np.nonzero(self.distance > self.radius)
+        return self.lat[rows], self.lon[cols], self.distance[rows, cols] - self.radius
+
+
+def analyze_coverage(polygon, stations, radius, resolution=0.5):
+    """计算区域内到最近台站超过 radius（km）的未覆盖区域
+
+    polygon: shapely 多边形（坐标为 (纬度, 经度)，与台站生成模块一致）
+    stations: StationStore/视图列表（各类已建设台站 + 生成台站）
+    resolution: 栅格分辨率（km）
+    """
+    lat_min, lon_min, lat_max, lon_max = polygon.bounds
+    lat_step = resolution / KM_PER_DEGREE
+    lon_step = resolution / (KM_PER_DEGREE * math.cos(math.radians((lat_min + lat_max) / 2)))
+    lat = np.arange(lat_min + lat_step / 2, lat_max, lat_step)
+    lon = np.arange(lon_min + lon_step / 2, lon_max, lon_step)
+    lat_grid, lon_grid = np.meshgrid(lat, lon, indexing='ij')
+
+    inside = shapely.contains_xy(polygon, lat_grid, lon_grid)
+    distance = np.full(lat_grid.shape, np.nan)
+
+    station_lat = np.concatenate([np.asarray(s.lat, dtype=np.float64) for s in stations] or [np.empty(0)])
+    station_lon = np.concatenate([np.asarray(s.lon, dtype=np.float64) for s in stations] or [np.empty(0)])
+    if len(station_lat):
+        # 用上界截断 KD 树查询，远离所有台站的栅格不必找出确切的最近台站
+        tree = cKDTree(to_unit_xyz(station_lat, station_lon))
+        chord, _ = tree.query(to_unit_xyz(lat_grid[inside], lon_grid[inside]),
+                              distance_upper_bound=km_to_chord(4 * radius))
+        nearest = chord_to_km(chord)
+        nearest[np.isinf(chord)] = np.inf
+        distance[inside] = nearest
+    else:
+        distance[inside] = np.inf
+
+    # 每行栅格面积随纬度变化
+    cell_area = (lat_step * KM_PER_DEGREE) * (lon_step * KM_PER_DEGREE) * np.cos(np.radians(lat))
+    uncovered = inside & (distance > radius)
+    total_area = float(np.sum(inside.sum(axis=1) * cell_area))
+    uncovered_area = float(np.sum(uncovered.sum(axis=1) * cell_area))
+    gaps = gap_polygons(uncovered, lat, lon, lat_step, lon_step, polygon)
+    return CoverageResult(lat, lon, distance, radius, total_area, uncovered_area, gaps)
+
+
+def gap_polygons(mask, lat, lon, lat_step, lon_step, polygon):
+    """将未覆盖栅格按行合并为矩形条带后求并，返回裁剪到区域内的多边形"""
+    boxes = []
+    for row in np.flatnonzero(mask.any(axis=1)):
+        line = np.r_[False, mask[row], False].astype(np.int8)
+        edges = np.flatnonzero(np.diff(line))
+        for start, end in zip(edges[::2], edges[1::2]):
+            boxes.append(box(lat[row] - lat_step / 2, lon[start] - lon_step / 2,
+                             lat[row] + lat_step / 2, lon[end - 1] + lon_step / 2))
+    if not boxes:
+        return []
+    merged = shapely.intersection(shapely.union_all(boxes), polygon)
+    parts = list(getattr(merged, 'geoms', [merged]))
+    parts = [part for part in parts if part.geom_type == 'Polygon' and not part.is_empty]
+    parts.sort(key=lambda part: -part.area)
+    return parts
+
+
+def coverage_layer(result, max_points=20000):
+    """未覆盖区域图层：红色半透明多边形 + 按超出距离加权的热力图"""
+    layer = folium.FeatureGroup(name="覆盖盲区")
+    swap = lambda x, y, z=None: (y, x)  # (纬度, 经度) -> GeoJSON 的 (经度, 纬度)
+    for gap in result.gaps:
+        folium.GeoJson(
+            mapping(transform(swap, gap)),
+            style_function=lambda _: {'color': 'red', 'weight': 1, 'fillColor': 'red', 'fillOpacity': 0.25}
+        ).add_to(layer)
+
+    lat, lon, excess = result.uncovered_cells()
+    if len(lat):
+        stride = max(1, len(lat) // max_points)
+        weight = np.minimum(np.nan_to_num(excess, posinf=result.radius) / result.radius, 1.0)
+        HeatMap(np.column_stack([lat, lon, weight])[::stride].tolist(), radius=12, blur=15).add_to(layer)
+    return layer
@@ -0,0 +1,52 @@
+import math
+import numpy as np
+import shapely
+from scipy.spatial import ConvexHull
+from shapely.geometry import Polygon
+from geodesy import degree_lengths
+from station_store import StationStore
+
+LAYOUTS = ('square', 'hex')  # 正方形网格 / 错行（六边形）网格
+
+
+def region_polygon(points):
+    """由任意顺序的顶点 [(纬度, 经度)] 构造凸多边形（与台站生成模块一致）"""
+    points_array = np.array(points, dtype=np.float64)
+    hull = ConvexHull(points_array)
+    polygon = Polygon([tuple(points_array[i]) for i in hull.vertices])
+    if not polygon.is_valid:
+        raise ValueError("生成的多边形无效")
+    return polygon
+
+
+def generate_grid(polygon, interval, layout='square', model=None):
+    """在多边形内按间隔（km）生成台站，返回 StationStore
+
+    square 布局与 StationApp.create_grid 的结果完全一致，只是改为向量化的点在多边形内判断。
+    model 为换算公里间隔使用的距离模型，为空时使用全局距离模型。
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"未知的布局: {layout}")
+    lat_min, lon_min, lat_max, lon_max = polygon.bounds
+    km_per_lat, km_per_lon = degree_lengths(lat_min, model)  # 每度对应的公里数，随距离模型变化
+    lat_step = interval / km_per_lat
+    lon_step = interval / km_per_lon
+
+    if layout == 'square':
+        lat_values = np.arange(lat_min, lat_max, lat_step)
+        lon_values = np.arange(lon_min, lon_max, lon_step)
+        lat_grid, lon_grid = np.meshgrid(lat_values, lon_values, indexing='ij')
+    else:
+        # 行距为间隔的 √3/2 倍，奇数行偏移半个间隔，相邻台站间距保持一致
+        lat_values = np.arange(lat_min, lat_max, lat_step * math.sqrt(3) / 2)
+        lon_values = np.arange(lon_min, lon_max + lon_step / 2, lon_step)
+        lat_grid, lon_grid = np.meshgrid(lat_values, lon_values, indexing='ij')
+        lon_grid = lon_grid + (np.arange(len(lat_values)) % 2)[:, None] * (lon_step / 2)
+
+    lat_grid = lat_grid.ravel()
+    lon_grid = lon_grid.ravel()
+    inside = shapely.contains_xy(polygon, lat_grid, lon_grid)
+    if not inside.any():
+        raise ValueError("生成台站失败：间隔过大或四边形面积不足")
+    return StationStore(lat_grid[inside], lon_grid[inside],
+                        [f"Station_{i + 1}" for i in range(int(inside.sum()))])
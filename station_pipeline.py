@@ -0,0 +1,217 @@
+import argparse
+import math
+from dataclasses import dataclass
+import numpy as np
+import shapely
+from distance_filter import nearest_within, pairs_within
+from station_thinning import THINNING_MODES, greedy_independent_set, thin_stations
+from fault_io import read_faults
+from geodesy import KM_PER_DEGREE, MODELS
+from station_grid import LAYOUTS, region_polygon, generate_grid
+from station_store import StationStore
+
+# 流水线参数及默认值；precision 为空时使用 geodesy 的全局距离模型
+DEFAULT_PARAMS = {
+    'region': None,  # 区域顶点 [(纬度, 经度)]
+    'interval': 5,  # 生成间隔（km）
+    'layout': 'square',
+    'model': None,  # 生成网格使用的距离模型，为空时使用 geodesy 的全局距离模型
+    'faults': None,  # FaultSet
+    'fault_buffer': 0,  # 断裂带避让距离（km），0 表示不避让
+    'existing': (),  # 已建设台站（StationStore 列表）
+    'screen_radius': 5,  # 与已建设台站的最小距离（km）
+    'dedupe_radius': 5,  # 候选台站之间的最小距离（km）
+    'dedupe_mode': 'drop',  # 冲突消解方式，见 station_thinning.THINNING_MODES
+    'precision': None,
+}
+
+
+@dataclass
+class Stage:
+    name: str
+    func: object
+    inputs: tuple  # 上游阶段名
+    params: tuple  # 本阶段使用的参数名
+
+
+def _same(a, b):
+    """判断参数是否未变化；台站集合、断裂带等对象按身份比较"""
+    if a is b:
+        return True
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and np.array_equal(a, b)
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+# ========== 各阶段 ==========
+def generate_stage(region, interval, layout, model):
+    if region is None:
+        raise ValueError("请先设置生成区域")
+    return generate_grid(region_polygon(region), interval, layout, model)
+
+
+def near_faults(lat, lon, faults, buffer_km):
+    """距任一断裂带不超过 buffer_km 的台站掩码（在台站中心纬度处做局部等距投影后计算点到折线距离）"""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    mask = np.zeros(len(lat), dtype=bool)
+    if faults is None or not len(faults) or buffer_km <= 0 or not len(lat):
+        return mask
+    counts = np.diff(faults.offsets)
+    segments = np.flatnonzero(counts >= 2)  # 只有一个顶点的断裂带无法构成折线
+    if not len(segments):
+        return mask
+    vertices = np.concatenate([np.arange(faults.offsets[i], faults.offsets[i + 1]) for i in segments])
+    lon_scale = KM_PER_DEGREE * math.cos(math.radians(float(np.mean(lat))))
+    lines = shapely.linestrings(
+        np.column_stack([faults.lon[vertices] * lon_scale, faults.lat[vertices] * KM_PER_DEGREE]),
+        indices=np.repeat(np.arange(len(segments)), counts[segments]))
+    points = shapely.points(np.column_stack([lon * lon_scale, lat * KM_PER_DEGREE]))
+    hits = shapely.STRtree(lines).query(points, predicate='dwithin', distance=buffer_km)
+    mask[hits[0]] = True
+    return mask
+
+
+def fault_stage(stations, faults, fault_buffer):
+    if faults is None or not len(faults) or fault_buffer <= 0:
+        return stations
+    return stations.view(~near_faults(stations.lat, stations.lon, faults, fault_buffer))
+
+
+def screen_stage(stations, existing, screen_radius, precision):
+    """剔除 screen_radius 内已有已建设台站的候选台站"""
+    existing = [s for s in existing if s is not None and len(s)]
+    if not existing or not len(stations):
+        return stations
+    lat = np.concatenate([s.lat for s in existing])
+    lon = np.concatenate([s.lon for s in existing])
+    nearest, _ = nearest_within(stations.lat, stations.lon, lat, lon, screen_radius, precision)
+    return stations.view(nearest < 0)
+
+
+def dedupe_stage(stations, dedupe_radius, dedupe_mode, precision):
+    """消解候选台站之间的间距冲突；drop 方式返回视图，合并方式返回新的台站集合"""
+    if dedupe_mode == 'drop':
+        i, j, _ = pairs_within(stations.lat, stations.lon, dedupe_radius, precision)
+        return stations.view(greedy_independent_set(len(stations), i, j))
+    return thin_stations(stations, dedupe_radius, dedupe_mode, precision=precision).stations
+
+
+def export_stage(stations):
+    return stations.to_frame()
+
+
+class StationPipeline:
+    """候选台站流水线：生成 → 断裂带避让 → 与已建设台站筛选 → 自检查去重 → 导出
+
+    阶段之间直接传递 StationStore/视图，不经过文件；结果按需计算并缓存，
+    参数变化后只重算使用该参数的阶段及其下游。参数对象被原地修改（如拖动已建设台站）时调用 invalidate。
+    """
+
+    def __init__(self, **params):
+        self.params = dict(DEFAULT_PARAMS)
+        self.versions = dict.fromkeys(self.params, 0)
+        self.stages = {}
+        self._results = {}  # 阶段名 -> (版本键, 结果)
+        self.computed = []  # 最近一次 result() 实际执行的阶段
+        self.add_stage('generate', generate_stage, params=('region', 'interval', 'layout', 'model'))
+        self.add_stage('faults', fault_stage, ('generate',), ('faults', 'fault_buffer'))
+        self.add_stage('screen', screen_stage, ('faults',), ('existing', 'screen_radius', 'precision'))
+        self.add_stage('dedupe', dedupe_stage, ('screen',), ('dedupe_radius', 'dedupe_mode', 'precision'))
+        self.add_stage('export', export_stage, ('dedupe',))
+        self.set(**params)
+
+    def add_stage(self, name, func, inputs=(), params=()):
+        for upstream in inputs:
+            if upstream not in self.stages:
+                raise ValueError(f"未知的上游阶段: {upstream}")
+        for param in params:
+            self.params.setdefault(param, None)
+            self.versions.setdefault(param, 0)
+        self.stages[name] = Stage(name, func, tuple(inputs), tuple(params))
+        self._results.pop(name, None)
+
+    def set(self, **params):
+        """更新参数，返回实际发生变化的参数名"""
+        changed = []
+        for name, value in params.items():
+            if name not in self.params:
+                raise KeyError(f"未知参数: {name}")
+            if name == 'layout' and value not in LAYOUTS:
+                raise ValueError(f"未知的布局: {value}")
+            if name == 'model' and value is not None and value not in MODELS:
+                raise ValueError(f"未知的距离模型: {value}")
+            if name == 'dedupe_mode' and value not in THINNING_MODES:
+                raise ValueError(f"未知的冲突消解方式: {value}")
+            if not _same(self.params[name], value):
+                self.params[name] = value
+                self.versions[name] += 1
+                changed.append(name)
+        return changed
+
+    def invalidate(self, *params):
+        """参数对象被原地修改后标记为已变化"""
+        for name in params:
+            self.versions[name] += 1
+
+    def key(self, name):
+        stage = self.stages[name]
+        return (tuple(self.versions[p] for p in stage.params), tuple(self.key(i) for i in stage.inputs))
+
+    def result(self, name='export'):
+        self.computed = []
+        return self._evaluate(name)
+
+    def _evaluate(self, name):
+        stage = self.stages[name]
+        key = self.key(name)
+        cached = self._results.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        inputs = [self._evaluate(upstream) for upstream in stage.inputs]
+        value = stage.func(*inputs, **{p: self.params[p] for p in stage.params})
+        self._results[name] = (key, value)
+        self.computed.append(name)
+        return value
+
+    def counts(self):
+        """各阶段（已计算的）台站数量"""
+        return {name: len(result) for name, (_, result) in self._results.items()
+                if name != 'export' and result is not None}
+
+    def export(self, file_path):
+        frame = self.result('export')
+        frame.to_excel(file_path, index=False)
+        return frame
+
+
+def parse_point(text):
+    lat, lon = (float(v) for v in text.split(','))
+    return lat, lon
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="候选台站流水线：生成 → 断裂带避让 → 筛选 → 去重 → 导出")
+    parser.add_argument("output", help="输出文件（xlsx）")
+    parser.add_argument("--region", nargs="+", type=parse_point, required=True, help="区域顶点：纬度,经度")
+    parser.add_argument("--interval", type=float, default=5, help="生成间隔（km）")
+    parser.add_argument("--layout", choices=LAYOUTS, default='square')
+    parser.add_argument("--faults", default=None, help="断裂带文件（GMT/GeoJSON/Shapefile）")
+    parser.add_argument("--fault-buffer", type=float, default=0, help="断裂带避让距离（km）")
+    parser.add_argument("--stations", nargs="+", default=[], help="已建设台站文件（xlsx）")
+    parser.add_argument("--screen-radius", type=float, default=5, help="与已建设台站的最小距离（km）")
+    parser.add_argument("--dedupe-radius", type=float, default=5, help="候选台站之间的最小距离（km）")
+    parser.add_argument("--dedupe-mode", choices=THINNING_MODES, default='drop', help="冲突消解方式")
+    args = parser.parse_args()
+
+    pipeline = StationPipeline(
+        region=args.region, interval=args.interval, layout=args.layout,
+        faults=read_faults(args.faults) if args.faults else None, fault_buffer=args.fault_buffer,
+        existing=tuple(StationStore.read_excel(path) for path in args.stations),
+        screen_radius=args.screen_radius, dedupe_radius=args.dedupe_radius, dedupe_mode=args.dedupe_mode)
+    pipeline.export(args.output)
+    for name, count in pipeline.counts().items():
+        print(f"{name}: {count}")
@@ -0,0 +1,346 @@
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+from scipy.spatial import QhullError
+from shapely.geometry import mapping
+from shapely.ops import transform
+from station_coverage import analyze_coverage
+from distance_filter import pairs_within
+from geodesy import distance, get_model, set_model
+from spatial_index import StaticIndex, close_pairs
+from station_grid import LAYOUTS, region_polygon, generate_grid
+from station_store import StationStore
+
+CHUNK_LINES = 1000  # NDJSON 每次写出的行数
+MAX_BODY = 256 * 1024 * 1024  # 请求体上限（字节）
+
+# 工作进程中常驻的台站目录，由进程池初始化函数加载一次
+_worker_catalogues = {}
+_END = object()  # NDJSON 行迭代结束标记
+
+
+class ServiceError(Exception):
+    """请求错误，status 为返回的 HTTP 状态码"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def stations_from_json(items):
+    """[{"name": 名称, "lat": 纬度, "lon": 经度}] 转为 StationStore"""
+    if not isinstance(items, list):
+        raise ServiceError(400, "stations 必须是数组")
+    try:
+        return StationStore([float(item['lat']) for item in items], [float(item['lon']) for item in items],
+                            [str(item.get('name', f"Station_{i + 1}")) for i, item in enumerate(items)])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ServiceError(400, f"台站数据格式错误: {e}")
+
+
+def number_param(payload, key, default, positive=False):
+    """读取数值参数，格式错误时返回 400"""
+    try:
+        value = float(payload.get(key, default))
+    except (TypeError, ValueError):
+        raise ServiceError(400, f"{key} 必须是数值")
+    if not math.isfinite(value) or value < 0 or (positive and value == 0):
+        raise ServiceError(400, f"{key} 必须是{'正数' if positive else '非负数'}")
+    return value
+
+
+def region_param(payload):
+    """读取区域顶点 [[纬度, 经度], ...]，无法构成多边形时返回 400"""
+    region = payload.get('region')
+    if not isinstance(region, list) or len(region) < 3:
+        raise ServiceError(400, "region 至少需要三个顶点")
+    try:
+        region = [(float(lat), float(lon)) for lat, lon in region]
+        region_polygon(region)
+    except (TypeError, ValueError, QhullError):
+        raise ServiceError(400, "region 顶点格式错误或无法构成多边形")
+    return region
+
+
+# ========== 进程池任务（模块级函数，便于序列化） ==========
+def _init_worker(catalogues, model):
+    set_model(model)  # 工作进程使用与主进程相同的距离模型
+    _worker_catalogues.clear()
+    _worker_catalogues.update(catalogues)
+
+
+def _self_check(lat, lon, name_codes, max_distance):
+    if get_model() == 'sphere':
+        i, j, distances = close_pairs(lat, lon, max_distance)
+    else:
+        i, j, distances = pairs_within(lat, lon, max_distance)
+    keep = name_codes[i] != name_codes[j]  # 站点名称不相等时才筛选
+    return i[keep], j[keep], distances[keep]
+
+
+def _generate(region, interval, layout):
+    grid = generate_grid(region_polygon(region), interval, layout)
+    return grid.lat, grid.lon
+
+
+def _coverage(region, radius, resolution, catalogue_keys, extra_lat, extra_lon):
+    polygon = region_polygon(region)
+    stations = [_worker_catalogues[key] for key in catalogue_keys]
+    stations.append(StationStore(extra_lat, extra_lon, [''] * len(extra_lat)))
+    result = analyze_coverage(polygon, stations, radius, resolution)
+    swap = lambda x, y, z=None: (y, x)
+    return {
+        'total_area': result.total_area,
+        'uncovered_area': result.uncovered_area,
+        'coverage_ratio': result.coverage_ratio,
+        'gaps': [mapping(transform(swap, gap)) for gap in result.gaps],
+    }
+
+
+class StationService:
+    """本地 HTTP/JSON 服务：常驻台站目录和空间索引，提供筛选、自检查、生成和覆盖分析接口
+
+    接口（均为 POST，请求体为 JSON）：
+        /catalogues  {"key": 目录名, "stations": [...]}               加载/替换台站目录
+        /screen      {"catalogue": 目录名, "stations": [...], "max_distance": km}
+        /self-check  {"stations": [...], "max_distance": km}
+        /generate    {"region": [[纬度, 经度], ...], "interval": km, "layout": "square"}
+        /coverage    {"region": [...], "radius": km, "resolution": km, "catalogues": [...], "stations": [...]}
+    /screen、/self-check、/generate 以 NDJSON 流式返回，其余返回 JSON。
+    """
+
+    def __init__(self, catalogues=None, max_workers=None):
+        self.catalogues = dict(catalogues or {})
+        self.indexes = {key: StaticIndex(s.lat, s.lon) for key, s in self.catalogues.items()}
+        self.max_workers = max_workers
+        self._pool = None
+        self._server = None
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/catalogues'): self.list_catalogues,
+            ('POST', '/catalogues'): self.load_catalogue,
+            ('POST', '/screen'): self.screen,
+            ('POST', '/self-check'): self.self_check,
+            ('POST', '/generate'): self.generate,
+            ('POST', '/coverage'): self.coverage,
+        }
+
+    # ========== 服务生命周期 ==========
+    async def start(self, host='127.0.0.1', port=8765):
+        self._server = await asyncio.start_server(self.handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self, host='127.0.0.1', port=8765):
+        await self.start(host, port)
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def pool(self):
+        # 台站目录变化后重建进程池，使工作进程中的目录保持最新；
+        # 事件循环已启动线程，用 spawn 启动工作进程以免 fork 后死锁
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_worker, initargs=(self.catalogues, get_model()))
+        return self._pool
+
+    async def run_in_pool(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool(), func, *args)
+
+    # ========== HTTP 处理 ==========
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    await self.send_json(writer, 413, {'error': "请求体过大"})
+                    break
+                body = await reader.readexactly(length) if length else b''
+                await self.dispatch(method, urlsplit(target).path, body, writer)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body, writer):
+        handler = self.routes.get((method, path))
+        if handler is None:
+            await self.send_json(writer, 404, {'error': f"未知接口: {method} {path}"})
+            return
+        try:
+            payload = json.loads(body) if body else {}
+            if not isinstance(payload, dict):
+                raise ServiceError(400, "请求体必须是 JSON 对象")
+            await handler(payload, writer)
+        except ConnectionError:
+            raise
+        except ServiceError as e:
+            await self.send_json(writer, e.status, {'error': str(e)})
+        except json.JSONDecodeError as e:
+            await self.send_json(writer, 400, {'error': f"JSON 格式错误: {e}"})
+        except Exception as e:
+            await self.send_json(writer, 500, {'error': str(e)})
+
+    async def send_json(self, writer, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                     f"Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+        await writer.drain()
+
+    async def send_ndjson(self, writer, rows):
+        """以分块传输编码流式写出 NDJSON，每块 CHUNK_LINES 行
+
+        响应头发出后出错时无法再改状态码，以一行 {"error": ...} 记录结束数据流，连接仍可继续使用。
+        """
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson; charset=utf-8\r\n"
+                     b"Transfer-Encoding: chunked\r\n\r\n")
+        lines = []
+        rows = iter(rows)
+        while True:
+            try:
+                row = next(rows, _END)
+                if row is _END:
+                    break
+                line = json.dumps(row, ensure_ascii=False)
+            except Exception as e:
+                lines.append(json.dumps({'error': str(e)}, ensure_ascii=False))
+                break
+            lines.append(line)
+            if len(lines) >= CHUNK_LINES:
+                await self._write_chunk(writer, lines)
+                lines = []
+        if lines:
+            await self._write_chunk(writer, lines)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _write_chunk(self, writer, lines):
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        writer.write(f"{len(data):X}\r\n".encode('latin-1') + data + b"\r\n")
+        await writer.drain()
+
+    # ========== 接口 ==========
+    async def health(self, payload, writer):
+        await self.send_json(writer, 200, {'status': 'ok'})
+
+    async def list_catalogues(self, payload, writer):
+        await self.send_json(writer, 200, {key: len(s) for key, s in self.catalogues.items()})
+
+    async def load_catalogue(self, payload, writer):
+        key = payload.get('key')
+        if not key:
+            raise ServiceError(400, "缺少 key")
+        stations = stations_from_json(payload.get('stations'))
+        self.add_catalogue(key, stations)
+        await self.send_json(writer, 200, {'key': key, 'count': len(stations)})
+
+    def add_catalogue(self, key, stations):
+        self.catalogues[key] = stations
+        self.indexes[key] = StaticIndex(stations.lat, stations.lon)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    async def screen(self, payload, writer):
+        key = payload.get('catalogue')
+        if key not in self.indexes:
+            raise ServiceError(404, f"未加载台站目录: {key}")
+        stations = stations_from_json(payload.get('stations'))
+        max_distance = number_param(payload, 'max_distance', 5)
+        # KD 树常驻内存，批量最近邻查询在线程中执行，不阻塞事件循环
+        idx, distances = await asyncio.to_thread(self.indexes[key].nearest_many, stations.lat, stations.lon)
+        existing = self.catalogues[key]
+        if get_model() != 'sphere' and len(existing):
+            # 按椭球面距离重新计算与最近台站的距离
+            distances = distance(stations.lat, stations.lon, existing.lat[idx], existing.lon[idx])
+        names = stations.names
+        # 目录为空时没有最近台站，距离输出 null（inf 不是合法的 JSON）
+        await self.send_ndjson(writer, (
+            {'name': names[i], 'closest': existing.name(int(idx[i])), 'distance': round(float(distances[i]), 2),
+             'within': bool(distances[i] <= max_distance)} if idx[i] >= 0 else
+            {'name': names[i], 'closest': None, 'distance': None, 'within': False}
+            for i in range(len(stations))))
+
+    async def self_check(self, payload, writer):
+        stations = stations_from_json(payload.get('stations'))
+        max_distance = number_param(payload, 'max_distance', 5)
+        i, j, distances = await self.run_in_pool(_self_check, stations.lat, stations.lon,
+                                                 stations.name_codes, max_distance)
+        names = stations.names
+        await self.send_ndjson(writer, (
+            {'a': names[a], 'b': names[b], 'index_a': int(a), 'index_b': int(b), 'distance': round(float(d), 2)}
+            for a, b, d in zip(i, j, distances)))
+
+    async def generate(self, payload, writer):
+        region = region_param(payload)
+        interval = number_param(payload, 'interval', 5, positive=True)
+        layout = payload.get('layout', 'square')
+        if layout not in LAYOUTS:
+            raise ServiceError(400, f"未知的布局: {layout}")
+        lat, lon = await self.run_in_pool(_generate, region, interval, layout)
+        await self.send_ndjson(writer, (
+            {'name': f"Station_{i + 1}", 'lat': float(a), 'lon': float(b)}
+            for i, (a, b) in enumerate(zip(lat, lon))))
+
+    async def coverage(self, payload, writer):
+        region = region_param(payload)
+        radius = number_param(payload, 'radius', 10, positive=True)
+        resolution = number_param(payload, 'resolution', 0.5, positive=True)
+        keys = payload.get('catalogues', list(self.catalogues))
+        if not isinstance(keys, list):
+            raise ServiceError(400, "catalogues 必须是数组")
+        missing = [key for key in keys if key not in self.catalogues]
+        if missing:
+            raise ServiceError(404, f"未加载台站目录: {', '.join(missing)}")
+        extra = stations_from_json(payload.get('stations', []))
+        result = await self.run_in_pool(_coverage, region, radius, resolution, keys, extra.lat, extra.lon)
+        await self.send_json(writer, 200, result)
+
+
+def parse_catalogue_args(items):
+    catalogues = {}
+    for item in items:
+        key, _, path = item.partition('=')
+        if not path:
+            raise SystemExit(f"台站目录参数格式应为 名称=文件路径: {item}")
+        catalogues[key] = StationStore.read_excel(path)
+    return catalogues
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="台站筛选与生成本地服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--catalogue", action="append", default=[], help="台站目录：名称=文件路径（xlsx）")
+    parser.add_argument("--workers", type=int, default=None, help="进程池大小")
+    args = parser.parse_args()
+
+    service = StationService(parse_catalogue_args(args.catalogue), args.workers)
+    print(f"服务已启动: http://{args.host}:{args.port}")
+    asyncio.run(service.serve_forever(args.host, args.port))
@@ -0,0 +1,240 @@
+import numpy as np
+import pandas as pd
+
+REQUIRED_COLUMNS = ('站点名称', '纬度', '经度')
+
+
+class NameTable:
+    """台站名称驻留表：相同名称只保存一份，台站只记录 int32 编号"""
+    __slots__ = ('names', 'codes', '_array')
+
+    def __init__(self):
+        self.names = []
+        self.codes = {}
+        self._array = None
+
+    def intern(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            code = len(self.names)
+            self.names.append(name)
+            self.codes[name] = code
+            self._array = None
+        return code
+
+    def intern_many(self, names):
+        return np.fromiter((self.intern(str(name)) for name in names), dtype=np.int32, count=len(names))
+
+    def lookup(self, codes):
+        if self._array is None:
+            self._array = np.asarray(self.names, dtype=object)
+        return self._array[codes] if len(self.names) else np.empty(0, dtype=object)
+
+
+class StationRecord:
+    """单个台站的轻量记录，只保存所属集合和行号"""
+    __slots__ = ('collection', 'row')
+
+    def __init__(self, collection, row):
+        self.collection = collection
+        self.row = row
+
+    @property
+    def name(self):
+        return self.collection.name(self.row)
+
+    @property
+    def lat(self):
+        return float(self.collection.lat[self.row])
+
+    @property
+    def lon(self):
+        return float(self.collection.lon[self.row])
+
+    @property
+    def station_id(self):
+        return int(self.collection.ids[self.row])
+
+    def __repr__(self):
+        return f"StationRecord({self.name!r}, {self.lat:.6f}, {self.lon:.6f})"
+
+
+def _writable(array):
+    # 视图缓存的坐标为只读数组，用来构造新集合时复制一份，保证 move 可以原地修改
+    return array if array.flags.writeable else array.copy()
+
+
+def _readonly(array):
+    array.setflags(write=False)
+    return array
+
+
+class StationStore:
+    """台站集合：连续的 float64 坐标数组 + 名称驻留表 + 稳定的台站ID
+
+    坐标只通过 move 原地修改，version 随之递增，视图据此判断缓存的坐标是否过期。
+    """
+    __slots__ = ('lat', 'lon', 'name_codes', 'ids', 'name_table', 'version')
+
+    def __init__(self, lat, lon, names=None, ids=None, name_table=None):
+        self.lat = _writable(np.ascontiguousarray(lat, dtype=np.float64))
+        self.lon = _writable(np.ascontiguousarray(lon, dtype=np.float64))
+        self.version = 0
+        if len(self.lat) != len(self.lon):
+            raise ValueError("纬度与经度数量不一致")
+        self.name_table = name_table if name_table is not None else NameTable()
+        if names is None:
+            names = [f"Station_{i + 1}" for i in range(len(self.lat))]
+        self.name_codes = self.name_table.intern_many(names)
+        self.ids = np.arange(len(self.lat), dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+
+    # ========== 构造 ==========
+    @classmethod
+    def from_frame(cls, df, name_table=None):
+        if not set(REQUIRED_COLUMNS).issubset(df.columns):
+            raise ValueError("文件缺少必要的列")
+        return cls(df['纬度'].to_numpy(), df['经度'].to_numpy(), df['站点名称'].to_numpy(), name_table=name_table)
+
+    @classmethod
+    def read_excel(cls, file_path, name_table=None):
+        return cls.from_frame(pd.read_excel(file_path), name_table=name_table)
+
+    @classmethod
+    def from_points(cls, points, prefix="Station_"):
+        """由 [(纬度, 经度)] 生成台站，名称为 prefix + 序号"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        names = [f"{prefix}{i + 1}" for i in range(len(points))]
+        return cls(points[:, 0], points[:, 1], names)
+
+    # ========== 访问 ==========
+    @property
+    def base(self):
+        return self
+
+    @property
+    def rows(self):
+        return np.arange(len(self.lat))
+
+    @property
+    def names(self):
+        return self.name_table.lookup(self.name_codes)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __getitem__(self, row):
+        return StationRecord(self, row)
+
+    def __iter__(self):
+        return (StationRecord(self, i) for i in range(len(self)))
+
+    def name(self, row):
+        return self.name_table.names[self.name_codes[row]]
+
+    def move(self, row, lat, lon):
+        """原地修改台站坐标，所有基于本集合的视图同步可见"""
+        self.lat[row] = lat
+        self.lon[row] = lon
+        self.version += 1
+
+    def view(self, rows):
+        """按行号或布尔掩码筛选，返回不复制坐标的视图"""
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return StationView(self, rows.astype(np.int64, copy=False))
+
+    def to_frame(self):
+        return pd.DataFrame({'站点名称': self.names, '纬度': self.lat, '经度': self.lon})
+
+    def materialize(self):
+        """复制为独立的 StationStore（共用名称表），之后的原地修改互不影响"""
+        return self.view(self.rows).materialize()
+
+    def nbytes(self):
+        return self.lat.nbytes + self.lon.nbytes + self.name_codes.nbytes + self.ids.nbytes
+
+
+class StationView:
+    """StationStore 的筛选视图：保存行号数组，坐标修改直接写回原集合
+
+    lat/lon/ids/name_codes 在首次访问时按行号取出一次并缓存为只读数组；
+    原集合经 move 修改坐标后（version 变化）重新取出坐标。
+    """
+    __slots__ = ('base', 'rows', '_coords', '_ids', '_name_codes')
+
+    def __init__(self, base, rows):
+        self.base = base
+        self.rows = rows
+        self._coords = None  # (原集合 version, 纬度, 经度)
+        self._ids = None
+        self._name_codes = None
+
+    def _coordinates(self):
+        if self._coords is None or self._coords[0] != self.base.version:
+            self._coords = (self.base.version, _readonly(self.base.lat[self.rows]),
+                            _readonly(self.base.lon[self.rows]))
+        return self._coords
+
+    @property
+    def lat(self):
+        return self._coordinates()[1]
+
+    @property
+    def lon(self):
+        return self._coordinates()[2]
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = _readonly(self.base.ids[self.rows])
+        return self._ids
+
+    @property
+    def name_codes(self):
+        if self._name_codes is None:
+            self._name_codes = _readonly(self.base.name_codes[self.rows])
+        return self._name_codes
+
+    @property
+    def name_table(self):
+        return self.base.name_table
+
+    @property
+    def names(self):
+        return self.base.name_table.lookup(self.name_codes)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, row):
+        return StationRecord(self, row)
+
+    def __iter__(self):
+        return (StationRecord(self, i) for i in range(len(self)))
+
+    def name(self, row):
+        return self.base.name(self.rows[row])
+
+    def move(self, row, lat, lon):
+        self.base.move(self.rows[row], lat, lon)
+
+    def view(self, rows):
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return StationView(self.base, self.rows[rows])
+
+    def to_frame(self):
+        return pd.DataFrame({'站点名称': self.names, '纬度': self.lat, '经度': self.lon})
+
+    def materialize(self):
+        """复制为独立的 StationStore（共用名称表）"""
+        store = StationStore.__new__(StationStore)
+        store.lat = self.base.lat[self.rows]
+        store.lon = self.base.lon[self.rows]
+        store.name_codes = self.base.name_codes[self.rows]
+        store.ids = self.base.ids[self.rows]
+        store.name_table = self.base.name_table
+        store.version = 0
+        return store
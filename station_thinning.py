@@ -0,0 +1,205 @@
+import argparse
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from distance_filter import pairs_within
+from spatial_index import from_unit_xyz, to_unit_xyz
+from station_store import StationStore
+
+# 冲突消解方式：名称 -> 界面显示文字
+THINNING_MODES = {
+    'drop': "删除多余台站",
+    'merge': "合并到保留台站（移至合并组中心）",
+    'component': "每个冲突分量合并为一个台站（移至分量中心）",
+}
+MAX_ROUNDS = 10  # 合并后台站位置改变可能产生新的冲突，最多重复消解的轮数
+
+
+@dataclass
+class ThinningResult:
+    """冲突消解结果
+
+    stations: 消解后的台站集合
+    source: 每个输入台站被保留或合并到的输出台站行号
+    rounds: 实际执行的消解轮数
+    """
+    stations: StationStore
+    source: np.ndarray
+    rounds: int
+
+    @property
+    def removed(self):
+        return len(self.source) - len(self.stations)
+
+
+def conflict_graph(n, i, j):
+    """由台站对 (i, j) 构造对称的冲突图（CSR 邻接矩阵）"""
+    i = np.asarray(i, dtype=np.int64)
+    j = np.asarray(j, dtype=np.int64)
+    rows = np.concatenate([i, j])
+    cols = np.concatenate([j, i])
+    graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n)).tocsr()
+    graph.sum_duplicates()
+    return graph
+
+
+def conflict_components(n, i, j):
+    """冲突图的连通分量，返回 (分量数, 每个台站的分量号)"""
+    return connected_components(conflict_graph(n, i, j), directed=False)
+
+
+def greedy_independent_set(n, i, j, weights=None):
+    """贪心求冲突图的极大独立集，返回保留台站的布尔掩码
+
+    按权重从大到小、冲突数从少到多、行号从小到大依次保留台站，并排除其所有冲突台站；
+    结果中任意两台站都不冲突，且每个被排除的台站至少与一个保留台站冲突。
+    """
+    graph = conflict_graph(n, i, j)
+    degree = np.diff(graph.indptr)
+    weights = np.zeros(n) if weights is None else np.asarray(weights, dtype=np.float64)
+    keep = degree == 0  # 没有冲突的台站直接保留
+    blocked = keep.copy()
+    order = np.lexsort((np.arange(n), degree, -weights))
+    indptr, indices = graph.indptr, graph.indices
+    for node in order[~blocked[order]].tolist():
+        if blocked[node]:
+            continue
+        keep[node] = True
+        blocked[node] = True
+        blocked[indices[indptr[node]:indptr[node + 1]]] = True
+    return keep
+
+
+def group_centroids(lat, lon, groups, n_groups, weights=None):
+    """按组计算加权球面中心（三维坐标平均），跨越 180° 经线的组也能得到正确位置"""
+    xyz = to_unit_xyz(lat, lon)
+    if weights is not None:
+        xyz = xyz * np.asarray(weights, dtype=np.float64)[:, None]
+    total = np.zeros((n_groups, 3))
+    np.add.at(total, groups, xyz)
+    return from_unit_xyz(total)
+
+
+def _merge_targets(keep, i, j, d):
+    """每个被排除的台站合并到与其距离最近的保留台站，返回每个台站所属的保留台站行号"""
+    target = np.where(keep, np.arange(len(keep)), -1)
+    a = np.concatenate([i, j])
+    b = np.concatenate([j, i])
+    d = np.concatenate([d, d])
+    candidates = ~keep[a] & keep[b]
+    a, b, d = a[candidates], b[candidates], d[candidates]
+    best = np.lexsort((b, d, a))
+    a, b = a[best], b[best]
+    first = np.r_[True, a[1:] != a[:-1]] if len(a) else np.zeros(0, dtype=bool)
+    target[a[first]] = b[first]
+    return target
+
+
+def _thin_once(lat, lon, i, j, d, mode, weights):
+    """执行一轮冲突消解，返回 (输出纬度, 输出经度, 代表台站行号, 每个台站的输出行号)"""
+    n = len(lat)
+    if mode == 'component':
+        n_groups, labels = conflict_components(n, i, j)
+        # 分量内权重最大（相同时行号最小）的台站作为代表，保留其名称；representative 按分量号排列
+        order = np.lexsort((np.arange(n), -weights, labels))
+        first = np.r_[True, labels[order][1:] != labels[order][:-1]]
+        representative = order[first]
+    else:
+        keep = greedy_independent_set(n, i, j, weights)
+        representative = np.flatnonzero(keep)
+        if mode == 'drop':
+            source = np.full(n, -1, dtype=np.int64)
+            source[representative] = np.arange(len(representative))
+            # 被删除的台站记为合并到最近的保留台站，便于追溯
+            target = _merge_targets(keep, i, j, d)
+            return lat[representative], lon[representative], representative, source[target]
+        n_groups = len(representative)
+        position = np.full(n, -1, dtype=np.int64)
+        position[representative] = np.arange(n_groups)
+        labels = position[_merge_targets(keep, i, j, d)]
+    # 中心按权重加权；权重全为 0 时按台站数平均
+    centroid_weights = weights + 1 if not weights.any() else np.maximum(weights, 0) + 1e-9
+    new_lat, new_lon = group_centroids(lat, lon, labels, n_groups, centroid_weights)
+    return new_lat, new_lon, representative, labels
+
+
+def thin_stations(stations, radius_km, mode='drop', weights=None, precision=None, ignore_same_name=False,
+                  max_rounds=MAX_ROUNDS):
+    """消解台站间距小于 radius_km 的冲突，返回 ThinningResult
+
+    drop 只保留贪心独立集中的台站；merge 把被排除的台站合并到最近的保留台站并移至合并组中心；
+    component 把每个冲突连通分量合并为一个台站。合并后若产生新的冲突则继续消解，
+    超过 max_rounds 轮后改为直接删除，保证结果满足最小间距。
+    weights 为台站优先级（越大越优先保留），ignore_same_name 时同名台站之间不算冲突（与台站自检查一致）。
+    """
+    if mode not in THINNING_MODES:
+        raise ValueError(f"未知的冲突消解方式: {mode}")
+    lat = np.array(stations.lat, dtype=np.float64)
+    lon = np.array(stations.lon, dtype=np.float64)
+    name_codes = np.asarray(stations.name_codes)
+    weights = np.zeros(len(lat)) if weights is None else np.asarray(weights, dtype=np.float64)
+    if len(weights) != len(lat):
+        raise ValueError("台站权重数量与台站数量不一致")
+    rows = np.arange(len(lat))  # 当前每个台站对应的原始台站行号（代表台站）
+    source = np.arange(len(lat))
+    rounds = 0
+    while True:
+        i, j, d = pairs_within(lat, lon, radius_km, precision)
+        if ignore_same_name:
+            different = name_codes[i] != name_codes[j]
+            i, j, d = i[different], j[different], d[different]
+        if not len(i):
+            break
+        round_mode = mode if rounds < max_rounds else 'drop'
+        lat, lon, representative, labels = _thin_once(lat, lon, i, j, d, round_mode, weights)
+        source = labels[source]
+        rows, name_codes = rows[representative], name_codes[representative]
+        # 合并后的台站继承组内最大权重
+        merged_weights = np.full(len(representative), -np.inf)
+        np.maximum.at(merged_weights, labels, weights)
+        weights = merged_weights
+        rounds += 1
+        if round_mode == 'drop':
+            break
+
+    result = StationStore(lat, lon, stations.name_table.lookup(name_codes), ids=stations.ids[rows],
+                          name_table=stations.name_table)
+    return ThinningResult(result, source, rounds)
+
+
+def class_weights(classes, weights_by_class, default=0.0):
+    """按台站类别映射优先级权重"""
+    return np.array([weights_by_class.get(c, default) for c in classes], dtype=np.float64)
+
+
+def parse_class_weight(text):
+    name, value = text.rsplit('=', 1)
+    return name, float(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="台站冲突消解：删除或合并间距过小的台站")
+    parser.add_argument("stations", help="台站文件（xlsx）")
+    parser.add_argument("output", help="输出文件（xlsx）")
+    parser.add_argument("--radius", type=float, default=5, help="最小台站间距（km）")
+    parser.add_argument("--mode", choices=THINNING_MODES, default='drop')
+    parser.add_argument("--weight-column", default=None, help="优先级列：数值列直接作为权重，否则按类别映射")
+    parser.add_argument("--class-weight", nargs="*", type=parse_class_weight, default=[],
+                        help="类别权重：类别=权重")
+    parser.add_argument("--precision", default=None, help="距离精度（sphere/wgs84/approx）")
+    args = parser.parse_args()
+
+    df = pd.read_excel(args.stations)
+    stations = StationStore.from_frame(df)
+    weights = None
+    if args.weight_column:
+        column = df[args.weight_column]
+        if pd.api.types.is_numeric_dtype(column):
+            weights = column.fillna(0).to_numpy(dtype=np.float64)
+        else:
+            weights = class_weights(column.to_numpy(), dict(args.class_weight))
+    result = thin_stations(stations, args.radius, args.mode, weights, args.precision)
+    result.stations.to_frame().to_excel(args.output, index=False)
+    print(f"输入 {len(stations)} 个台站，输出 {len(result.stations)} 个，消解 {result.rounds} 轮")
@@ -0,0 +1,85 @@
+import numpy as np
+from edit_journal import Edit, EditJournal
+from station_store import StationStore
+
+
+def test_undo_redo_order():
+    journal = EditJournal()
+    a = journal.record(Edit('filter', (), 0, 1))
+    b = journal.record(Edit('filter', (), 1, 2))
+    assert len(journal) == 2 and journal.can_undo and not journal.can_redo
+    assert journal.undo() is b
+    assert journal.undo() is a
+    assert journal.undo() is None
+    assert journal.redo() is a
+    assert journal.redo() is b
+    assert journal.redo() is None
+
+
+def test_new_edit_clears_redo():
+    journal = EditJournal()
+    journal.record(Edit('filter', (), 0, 1))
+    journal.undo()
+    assert journal.can_redo
+    c = journal.record(Edit('filter', (), 0, 2))
+    assert not journal.can_redo
+    assert journal.undo() is c
+
+
+def test_limit_drops_oldest_edits():
+    journal = EditJournal(limit=3)
+    edits = [journal.record(Edit('filter', (), i, i + 1)) for i in range(5)]
+    assert len(journal) == 3
+    assert [journal.undo() for _ in range(4)] == [edits[4], edits[3], edits[2], None]
+
+
+class MovedStations:
+    """按台站模块的方式应用拖动编辑：原地移动台站并记录是否被拖动过"""
+
+    def __init__(self, stations):
+        self.stations = stations
+        self.moved_rows = set()
+        self.journal = EditJournal()
+
+    def drag(self, idx, lat, lon):
+        before = (float(self.stations.lat[idx]), float(self.stations.lon[idx]), idx in self.moved_rows)
+        self.journal.record(Edit('move', (idx,), before, (lat, lon, True)))
+        self.apply(idx, (lat, lon, True))
+
+    def apply(self, idx, state):
+        lat, lon, moved = state
+        self.stations.move(idx, lat, lon)
+        if moved:
+            self.moved_rows.add(idx)
+        else:
+            self.moved_rows.discard(idx)
+
+    def undo(self):
+        edit = self.journal.undo()
+        self.apply(edit.rows[0], edit.before)
+
+    def redo(self):
+        edit = self.journal.redo()
+        self.apply(edit.rows[0], edit.after)
+
+
+def test_station_move_round_trip():
+    stations = StationStore([30.0, 31.0, 32.0], [100.0, 101.0, 102.0])
+    view = stations.view([1, 2])
+    module = MovedStations(stations)
+    module.drag(1, 31.5, 101.5)
+    module.drag(1, 31.7, 101.7)
+    module.drag(2, 32.5, 102.5)
+    np.testing.assert_array_equal(view.lat, [31.7, 32.5])
+
+    for _ in range(3):
+        module.undo()
+    np.testing.assert_array_equal(stations.lat, [30.0, 31.0, 32.0])
+    np.testing.assert_array_equal(stations.lon, [100.0, 101.0, 102.0])
+    np.testing.assert_array_equal(view.lat, [31.0, 32.0])  # 视图缓存随原集合 version 刷新
+    assert module.moved_rows == set()
+
+    module.redo()
+    module.redo()
+    np.testing.assert_array_equal(view.lon, [101.7, 102.0])
+    assert module.moved_rows == {1}
@@ -0,0 +1,32 @@
+import numpy as np
+from fault_io import parse_gmt_header, read_gmt
+
+
+def test_header_keeps_hyphenated_names():
+    assert parse_gmt_header("> Xianshuihe-Anninghe fault") == {'name': "Xianshuihe-Anninghe fault"}
+    assert parse_gmt_header('> -L"Longmenshan-Beichuan" -Z5') == {'name': "Longmenshan-Beichuan", 'Z': "5"}
+    assert parse_gmt_header("> Tan-Lu fault -Z3 type=strike-slip") == {
+        'name': "Tan-Lu fault", 'Z': "3", 'type': "strike-slip"}
+
+
+def test_malformed_rows_are_skipped(tmp_path):
+    path = tmp_path / "faults.txt"
+    path.write_text("> Xianshuihe-Anninghe fault\n"
+                    "118.0 31.9\n"
+                    "118.1 32.0 5\n"
+                    "118.2\n"
+                    "118.3 32.2\n"
+                    "abc 32.3\n"
+                    "> second\n"
+                    "119.0 33.0\n"
+                    "119.1 33.1\n", encoding="utf-8")
+    faults = read_gmt(str(path))
+
+    assert len(faults) == 2
+    assert faults.name(0) == "Xianshuihe-Anninghe fault"
+    lat, lon = faults.segment(0)
+    np.testing.assert_array_equal(lat, [31.9, 32.2])
+    np.testing.assert_array_equal(lon, [118.0, 118.3])
+    lat, lon = faults.segment(1)
+    np.testing.assert_array_equal(lat, [33.0, 33.1])
+    np.testing.assert_array_equal(lon, [119.0, 119.1])
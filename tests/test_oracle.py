@@ -0,0 +1,12 @@
+import pytest
+from oracle_check import SIZES, oracle_cases, run_cases
+
+# 每个 (规模, 比较项) 单独成为一个测试，失败时能直接看出是哪个实现与原始算法不一致
+CASES = [(n, k, case.check) for n in SIZES for k, case in enumerate(oracle_cases(n))]
+
+
+@pytest.mark.parametrize("n, k, check", CASES, ids=[f"{n}-{check}" for n, _, check in CASES])
+def test_engines_match_reference(n, k, check):
+    rows = [row for row, _, _ in run_cases([oracle_cases(n)[k]])]
+    mismatches = [row for row in rows if not row[-1]]
+    assert not mismatches, mismatches
@@ -0,0 +1,55 @@
+import pickle
+import sqlite3
+import numpy as np
+from project_store import ProjectStore
+from station_store import StationStore
+
+
+def test_stage_payloads_round_trip(tmp_path):
+    project = ProjectStore(str(tmp_path / "p.sqlite"))
+    grid = StationStore([30.5, 31.0], [100.0, 100.5], ["Station_1", "Station_2"])
+    project.save_stage('grid', 'h1', {'interval': 5}, grid)
+    project.save_stage('screen', 'h2', {'max_distance': 5}, ([["a", "b", 1.25]], [0, 3]))
+
+    loaded = project.load_stage('grid', 'h1')
+    np.testing.assert_array_equal(loaded.lat, grid.lat)
+    np.testing.assert_array_equal(loaded.lon, grid.lon)
+    assert list(loaded.names) == ["Station_1", "Station_2"]
+    assert project.load_stage('screen', 'h2') == [[["a", "b", 1.25]], [0, 3]]
+    assert project.load_stage('screen', 'other') is None
+    assert project.stage_params('grid') == {'interval': 5}
+
+
+def test_old_pickled_stages_are_never_loaded(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE stages (name TEXT PRIMARY KEY, input_hash TEXT NOT NULL, params TEXT NOT NULL, "
+                 "payload BLOB NOT NULL)")
+    conn.execute("INSERT INTO stages VALUES ('grid', 'h', '{}', ?)", (pickle.dumps([1, 2]),))
+    conn.commit()
+    conn.close()
+
+    assert ProjectStore(path).load_stage('grid', 'h') is None
+
+
+def test_clear_removes_cached_content(tmp_path):
+    project = ProjectStore(str(tmp_path / "p.sqlite"))
+    project.save_stations('sifen', StationStore([30.0], [100.0], ["a"]))
+    project.save_stage('self_check', 'h', {}, [[0, 1, 2.5]])
+    project.clear()
+    assert project.load_stations('sifen') is None
+    assert project.stage_params('self_check') is None
+
+
+def test_old_rtree_index_is_dropped(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE VIRTUAL TABLE station_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+    conn.commit()
+    conn.close()
+
+    project = ProjectStore(path)
+    project.save_stations('sifen', StationStore([30.0], [100.0], ["a"]))
+    tables = {row[0] for row in project.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert 'station_rtree' not in tables
+    assert list(project.load_stations('sifen').names) == ["a"]
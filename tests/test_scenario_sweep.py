@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from geodesy import distance, get_model, set_model
+from scenario_sweep import Scenario, _init_worker, load_scenarios, run_scenario
+from station_grid import region_polygon, generate_grid
+
+
+def write_table(path, rows):
+    pd.DataFrame(rows, columns=["场景", "顶点", "间隔(km)", "布局", "筛选半径(km)"]).to_excel(path, index=False)
+
+
+def test_blank_cells_use_defaults(tmp_path):
+    path = tmp_path / "scenarios.xlsx"
+    write_table(path, [["a", "30 100; 30 101; 31 101", 5, "hex", 8],
+                       ["b", "30 100; 30 101; 31 101", 10, None, None]])
+    a, b = load_scenarios(path)
+    assert (a.layout, a.radius) == ("hex", 8)
+    assert (b.layout, b.radius) == ("square", 5)
+    assert b.region == [(30.0, 100.0), (30.0, 101.0), (31.0, 101.0)]
+
+
+def test_blank_interval_is_rejected(tmp_path):
+    path = tmp_path / "scenarios.xlsx"
+    write_table(path, [["a", "30 100; 30 101; 31 101", None, "square", 5]])
+    with pytest.raises(ValueError, match="a"):
+        load_scenarios(path)
+
+
+def test_wgs84_screening_uses_ellipsoidal_distance():
+    region = [(30.0, 100.0), (30.0, 100.3), (30.3, 100.3), (30.3, 100.0)]
+    grid = generate_grid(region_polygon(region), 5, model='wgs84')
+    existing_lat, existing_lon = np.array([grid.lat[0] - 0.04]), np.array([grid.lon[0]])
+    sphere = distance(grid.lat[0], grid.lon[0], existing_lat[0], existing_lon[0], model='sphere')
+    wgs84 = distance(grid.lat[0], grid.lon[0], existing_lat[0], existing_lon[0], model='wgs84')
+    radius = (sphere + wgs84) / 2  # 球面距离超出半径，椭球面距离在半径内
+    assert wgs84 < radius < sphere
+
+    model = get_model()
+    try:
+        _init_worker(existing_lat, existing_lon, 'wgs84')
+        row = run_scenario(Scenario("boundary", region, 5, radius=radius))
+    finally:
+        set_model(model)
+    expected = int((distance(grid.lat, grid.lon, existing_lat[0], existing_lon[0], model='wgs84') <= radius).sum())
+    assert expected == 1
+    assert row[5] == expected
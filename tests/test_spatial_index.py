@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from geodesy import haversine
+from spatial_index import DynamicIndex
+
+RADIUS = 5
+EPS = 1e-6  # 弦长换算与 haversine 的舍入差异
+
+
+def clusters(rng):
+    """普通区域、北极附近和 180° 经线两侧的台站"""
+    lat = np.concatenate([30 + rng.random(100) * 0.3, 89.9 + rng.random(60) * 0.1, -20 + rng.random(60) * 0.2])
+    lon = np.concatenate([100 + rng.random(100) * 0.3, rng.random(60) * 360 - 180,
+                          np.where(rng.random(60) < 0.5, 179.9 + rng.random(60) * 0.1, -180 + rng.random(60) * 0.1)])
+    return lat, lon
+
+
+def assert_matches_brute_force(index, lat, lon, i, radius=RADIUS):
+    found, distances = index.neighbors(i, radius)
+    d = haversine(lat[i], lon[i], lat, lon)
+    d[i] = np.inf
+    found = set(found.tolist())
+    assert set(np.flatnonzero(d <= radius - EPS).tolist()) <= found
+    assert found <= set(np.flatnonzero(d <= radius + EPS).tolist())
+    np.testing.assert_allclose(np.sort(distances), np.sort(d[sorted(found)]), atol=1e-6)
+
+
+def test_neighbors_after_moves():
+    rng = np.random.default_rng(7)
+    lat, lon = clusters(rng)
+    index = DynamicIndex(lat, lon, RADIUS)
+    n = len(lat)
+    for step in range(300):
+        i = int(rng.integers(n))
+        if step % 3 == 0:
+            # 跳到另一个台站附近：跨越多个体素，可能跨越极区或 180° 经线
+            j = int(rng.integers(n))
+            new_lat = float(np.clip(lat[j] + rng.normal(0, 0.02), -90, 90))
+            new_lon = float((lon[j] + rng.normal(0, 0.02) + 180) % 360 - 180)
+        else:
+            # 小范围拖动，常常跨越体素边界
+            new_lat = float(np.clip(lat[i] + rng.normal(0, 0.03), -90, 90))
+            new_lon = float((lon[i] + rng.normal(0, 0.03) + 180) % 360 - 180)
+        lat[i], lon[i] = new_lat, new_lon
+        index.move(i, new_lat, new_lon)
+        assert_matches_brute_force(index, lat, lon, i)
+    for i in range(n):
+        assert_matches_brute_force(index, lat, lon, i)
+        assert_matches_brute_force(index, lat, lon, i, radius=2 * RADIUS)  # 半径大于体素边长
+
+
+def test_buckets_follow_moves():
+    index = DynamicIndex([0.0, 0.0], [0.0, 1.0], RADIUS)
+    index.move(1, 0.0, 0.01)
+    assert index.neighbors(0)[0].tolist() == [1]
+    index.move(1, 0.0, 1.0)
+    assert index.neighbors(0)[0].tolist() == []
+    assert len(index) == 2
+    assert sum(len(bucket) for bucket in index.buckets.values()) == 2
+
+
+@pytest.mark.parametrize('a, b', [((89.99, 0.0), (89.99, 180.0)), ((0.0, 179.99), (0.0, -179.99))])
+def test_query_radius_across_pole_and_antimeridian(a, b):
+    index = DynamicIndex([a[0], 45.0], [a[1], 45.0], RADIUS)
+    found, distances = index.query_radius(*b)
+    assert found.tolist() == [0]
+    assert distances[0] == pytest.approx(float(haversine(*a, *b)), abs=1e-6)
@@ -0,0 +1,68 @@
+import numpy as np
+from station_pipeline import StationPipeline
+from station_store import StationStore
+
+REGION = [(30.0, 100.0), (30.0, 100.5), (30.5, 100.5), (30.5, 100.0)]
+EXISTING = StationStore([30.2, 30.4], [100.2, 100.4], ["E1", "E2"])
+
+
+def make_pipeline(**params):
+    params = {'region': REGION, 'interval': 5, 'existing': (EXISTING,), 'screen_radius': 5,
+              'dedupe_radius': 4, 'model': 'sphere', **params}
+    pipeline = StationPipeline(**params)
+    pipeline.result()
+    return pipeline
+
+
+def test_model_switch_regenerates_grid():
+    pipeline = make_pipeline()
+    sphere = pipeline.result('generate')
+    pipeline.set(model='wgs84')
+    pipeline.result()
+    assert pipeline.computed == ['generate', 'faults', 'screen', 'dedupe', 'export']
+    wgs84 = pipeline.result('generate')
+    assert not np.array_equal(sphere.lon, wgs84.lon)
+
+
+def test_unchanged_params_reuse_cache():
+    pipeline = make_pipeline()
+    first = pipeline.result()
+    assert pipeline.set(interval=5, screen_radius=5) == []
+    assert pipeline.result() is first
+    assert pipeline.computed == []
+
+
+def test_param_change_reruns_only_dependent_stages():
+    pipeline = make_pipeline()
+    generated = pipeline.result('generate')
+    assert pipeline.set(dedupe_radius=6) == ['dedupe_radius']
+    pipeline.result()
+    assert pipeline.computed == ['dedupe', 'export']
+    assert pipeline.result('generate') is generated
+
+    pipeline.set(screen_radius=3)
+    pipeline.result()
+    assert pipeline.computed == ['screen', 'dedupe', 'export']
+
+    pipeline.set(interval=4)
+    pipeline.result('screen')
+    assert pipeline.computed == ['generate', 'faults', 'screen']
+
+
+def test_invalidate_existing_reruns_screen_and_dedupe():
+    pipeline = make_pipeline()
+    generated = pipeline.result('generate')
+    before = len(pipeline.result('screen'))
+    existing = StationStore(EXISTING.lat, EXISTING.lon)
+    pipeline.set(existing=(existing,))
+    pipeline.result()
+    # 台站被原地拖动：参数对象不变，需要显式标记失效
+    existing.move(0, 50.0, 120.0)
+    existing.move(1, 50.0, 120.0)
+    pipeline.result()
+    assert pipeline.computed == []
+    pipeline.invalidate('existing')
+    pipeline.result()
+    assert pipeline.computed == ['screen', 'dedupe', 'export']
+    assert pipeline.result('generate') is generated
+    assert len(pipeline.result('screen')) > before
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import urllib.error
+import urllib.request
+import numpy as np
+from distance_filter import pairs_within
+from station_grid import region_polygon, generate_grid
+from station_service import StationService
+from station_store import StationStore
+
+REGION = [[30.0, 100.0], [30.0, 100.3], [30.3, 100.3], [30.3, 100.0]]
+EXISTING = StationStore([30.0, 30.2], [100.0, 100.2], ["E1", "E2"])
+STATIONS = [{'name': "A", 'lat': 30.01, 'lon': 100.0},
+            {'name': "B", 'lat': 30.21, 'lon': 100.21},
+            {'name': "C", 'lat': 30.5, 'lon': 100.5},
+            {'name': "D", 'lat': 30.52, 'lon': 100.5}]
+
+
+def request(url, path, payload=None):
+    """返回 (状态码, 响应体)"""
+    data = None if payload is None else json.dumps(payload).encode('utf-8')
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url + path, data=data), timeout=60) as response:
+            return response.status, response.read().decode('utf-8')
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode('utf-8')
+
+
+def ndjson(body):
+    return [json.loads(line) for line in body.splitlines() if line]
+
+
+async def run_client(check):
+    service = StationService({'existing': EXISTING}, max_workers=1)
+    host, port = await service.start('127.0.0.1', 0)
+    try:
+        return await asyncio.to_thread(check, f"http://{host}:{port}")
+    finally:
+        await service.close()
+
+
+def test_endpoints_over_loopback():
+    def check(url):
+        assert request(url, '/health') == (200, '{"status": "ok"}')
+
+        status, body = request(url, '/screen', {'catalogue': 'existing', 'stations': STATIONS, 'max_distance': 5})
+        assert status == 200
+        rows = ndjson(body)
+        assert [r['closest'] for r in rows] == ["E1", "E2", "E2", "E2"]
+        assert [r['within'] for r in rows] == [True, True, False, False]
+
+        status, body = request(url, '/self-check', {'stations': STATIONS, 'max_distance': 5})
+        assert status == 200
+        lat = np.array([s['lat'] for s in STATIONS])
+        lon = np.array([s['lon'] for s in STATIONS])
+        i, j, _ = pairs_within(lat, lon, 5)
+        assert [(r['index_a'], r['index_b']) for r in ndjson(body)] == list(zip(i.tolist(), j.tolist()))
+
+        status, body = request(url, '/generate', {'region': REGION, 'interval': 5, 'layout': 'hex'})
+        assert status == 200
+        rows = ndjson(body)
+        grid = generate_grid(region_polygon([tuple(p) for p in REGION]), 5, 'hex')
+        np.testing.assert_allclose([r['lat'] for r in rows], grid.lat)
+        np.testing.assert_allclose([r['lon'] for r in rows], grid.lon)
+
+        status, body = request(url, '/coverage', {'region': REGION, 'radius': 10, 'resolution': 2})
+        assert status == 200
+        assert 0 < json.loads(body)['coverage_ratio'] <= 1
+
+    asyncio.run(run_client(check))
+
+
+def test_screen_against_empty_catalogue():
+    def check(url):
+        assert request(url, '/catalogues', {'key': 'empty', 'stations': []})[0] == 200
+        status, body = request(url, '/screen', {'catalogue': 'empty', 'stations': STATIONS[:2]})
+        assert status == 200
+        assert 'Infinity' not in body
+        assert ndjson(body) == [{'name': "A", 'closest': None, 'distance': None, 'within': False},
+                                {'name': "B", 'closest': None, 'distance': None, 'within': False}]
+
+    asyncio.run(run_client(check))
+
+
+def test_bad_parameters_return_400():
+    def check(url):
+        cases = [
+            ('/screen', {'catalogue': 'existing', 'stations': STATIONS, 'max_distance': "abc"}),
+            ('/self-check', {'stations': STATIONS, 'max_distance': None}),
+            ('/generate', {'region': REGION, 'layout': "bogus"}),
+            ('/generate', {'region': REGION, 'interval': 0}),
+            ('/generate', {'region': [[30, 100], [30, 100], [30, 100]]}),
+            ('/coverage', {'region': REGION, 'resolution': "x"}),
+            ('/self-check', [1, 2]),
+        ]
+        for path, payload in cases:
+            status, body = request(url, path, payload)
+            assert status == 400, (path, payload, body)
+            assert 'error' in json.loads(body)
+
+    asyncio.run(run_client(check))
+
+
+class Collector:
+    """收集写出字节的最小 writer"""
+
+    def __init__(self):
+        self.data = b''
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+
+def test_stream_error_ends_with_error_record():
+    def rows():
+        yield {'n': 1}
+        yield {'n': 2}
+        raise RuntimeError("boom")
+
+    writer = Collector()
+    asyncio.run(StationService().send_ndjson(writer, rows()))
+    head, _, body = writer.data.partition(b"\r\n\r\n")
+    assert b"Transfer-Encoding: chunked" in head
+    assert body.endswith(b"0\r\n\r\n")
+    assert body.count(b"HTTP/1.1") == 0
+    size, _, rest = body.partition(b"\r\n")
+    chunk = rest[:int(size, 16)].decode('utf-8')
+    assert ndjson(chunk) == [{'n': 1}, {'n': 2}, {'error': "boom"}]
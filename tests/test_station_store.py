@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from station_store import StationStore
+
+
+def test_view_caches_arrays_until_base_moves():
+    store = StationStore([30.0, 31.0, 32.0], [100.0, 101.0, 102.0], ["a", "b", "c"])
+    view = store.view([0, 2])
+    lat = view.lat
+    assert view.lat is lat
+    assert view.name_codes is view.name_codes
+    with pytest.raises(ValueError):
+        lat[0] = 0
+
+    view.move(1, 35.0, 105.0)
+    assert view.lat is not lat
+    np.testing.assert_array_equal(view.lat, [30.0, 35.0])
+    np.testing.assert_array_equal(store.view([2]).lon, [105.0])
+
+
+def test_copies_are_independent_of_view():
+    store = StationStore([30.0, 31.0], [100.0, 101.0])
+    view = store.view([1])
+    copy = view.materialize()
+    copy.move(0, 0.0, 0.0)
+    rebuilt = StationStore(view.lat, view.lon)
+    rebuilt.move(0, 1.0, 1.0)
+    np.testing.assert_array_equal(view.lat, [31.0])
+    np.testing.assert_array_equal(store.lat, [30.0, 31.0])
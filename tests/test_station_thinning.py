@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from distance_filter import pairs_within
+from geodesy import distance
+from station_store import StationStore
+from station_thinning import THINNING_MODES, greedy_independent_set, group_centroids, thin_stations
+
+RADIUS = 5
+
+
+def random_stations(n=300, seed=1):
+    rng = np.random.default_rng(seed)
+    return StationStore(30 + rng.random(n) * 0.5, 100 + rng.random(n) * 0.5)
+
+
+def residual_pairs(stations, radius=RADIUS):
+    i, _, _ = pairs_within(stations.lat, stations.lon, radius)
+    return len(i)
+
+
+@pytest.mark.parametrize('mode', THINNING_MODES)
+def test_no_conflicts_remain(mode):
+    stations = random_stations()
+    assert residual_pairs(stations) > 0
+    result = thin_stations(stations, RADIUS, mode)
+    assert residual_pairs(result.stations) == 0
+    assert 0 < len(result.stations) < len(stations)
+    assert result.removed == len(stations) - len(result.stations)
+
+
+def test_drop_keeps_high_weight_stations():
+    stations = StationStore([30.0, 30.03, 30.06], [100.0, 100.0, 100.0], ["a", "b", "c"])
+    # 相邻台站间距约 3.3 km，两端台站约 6.7 km：默认按冲突数保留两端台站；中间台站权重最高时只保留它
+    assert list(thin_stations(stations, RADIUS).stations.names) == ["a", "c"]
+    weighted = thin_stations(stations, RADIUS, weights=[0, 1, 0])
+    assert list(weighted.stations.names) == ["b"]
+
+    # 被拖动过的台站（权重为 1）优先保留：取无权重时被删除、且彼此不冲突的几个台站
+    stations = random_stations()
+    dropped = np.setdiff1d(np.arange(len(stations)), thin_stations(stations, RADIUS).stations.ids)
+    i, j, _ = pairs_within(stations.lat, stations.lon, RADIUS)
+    chosen = greedy_independent_set(len(stations), i, j, weights=np.isin(np.arange(len(stations)), dropped))
+    chosen = np.intersect1d(np.flatnonzero(chosen), dropped)[:5]
+    assert len(chosen) == 5
+    moved = np.zeros(len(stations))
+    moved[chosen] = 1
+    result = thin_stations(stations, RADIUS, 'drop', weights=moved)
+    assert set(chosen.tolist()) <= set(result.stations.ids.tolist())
+
+
+def test_merge_follows_weights():
+    stations = StationStore([30.0, 30.01], [100.0, 100.0], ["a", "b"])
+    plain = thin_stations(stations, RADIUS, 'merge')
+    assert list(plain.stations.names) == ["a"]
+    assert plain.stations.lat[0] == pytest.approx(30.005, abs=1e-9)
+    # 合并中心按权重加权，权重高的台站保留名称和位置
+    weighted = thin_stations(stations, RADIUS, 'merge', weights=[0, 2])
+    assert list(weighted.stations.names) == ["b"]
+    assert weighted.stations.lat[0] == pytest.approx(30.01, abs=1e-6)
+
+
+def test_ignore_same_name():
+    stations = StationStore([30.0, 30.01, 30.02], [100.0, 100.0, 100.0], ["a", "a", "b"])
+    assert list(thin_stations(stations, RADIUS, ignore_same_name=True).stations.names) == ["a", "a"]
+    assert len(thin_stations(stations, RADIUS).stations) == 1
+    same = StationStore([30.0, 30.01], [100.0, 100.0], ["a", "a"])
+    assert len(thin_stations(same, RADIUS, ignore_same_name=True).stations) == 2
+    assert len(thin_stations(same, RADIUS).stations) == 1
+
+
+def test_drop_source_points_to_kept_station():
+    stations = random_stations()
+    result = thin_stations(stations, RADIUS, 'drop')
+    out = result.stations
+    assert len(result.source) == len(stations)
+    assert result.source.min() >= 0 and result.source.max() < len(out)
+    kept = out.ids  # 保留台站对应的输入行号
+    np.testing.assert_array_equal(result.source[kept], np.arange(len(out)))
+    np.testing.assert_array_equal(out.lat, stations.lat[kept])
+    # 被删除的台站与其去向台站冲突
+    removed = np.setdiff1d(np.arange(len(stations)), kept)
+    d = distance(stations.lat[removed], stations.lon[removed],
+                 out.lat[result.source[removed]], out.lon[result.source[removed]])
+    assert (d <= RADIUS).all()
+
+
+@pytest.mark.parametrize('mode, n, seed', [('merge', 30, 7), ('component', 100, 3)])
+def test_merged_station_is_group_centroid(mode, n, seed):
+    # 一轮即可消解的输入：每个输出台站位于 source 指向它的输入台站的中心
+    stations = random_stations(n, seed)
+    result = thin_stations(stations, RADIUS, mode)
+    assert result.rounds == 1
+    lat, lon = group_centroids(stations.lat, stations.lon, result.source, len(result.stations))
+    np.testing.assert_allclose(result.stations.lat, lat)
+    np.testing.assert_allclose(result.stations.lon, lon)
+    assert residual_pairs(result.stations) == 0
+
+
+def test_stops_within_max_rounds():
+    # 该输入合并后会产生新的冲突，不限轮数时需要 3 轮
+    stations = random_stations()
+    assert thin_stations(stations, RADIUS, 'merge').rounds == 3
+    for max_rounds in (0, 1, 2):
+        # 达到 max_rounds 后最后一轮改为直接删除
+        result = thin_stations(stations, RADIUS, 'merge', max_rounds=max_rounds)
+        assert result.rounds == max_rounds + 1
+        assert residual_pairs(result.stations) == 0
+        assert (result.source >= 0).all()
+
+
+def test_greedy_independent_set_is_maximal():
+    stations = random_stations()
+    i, j, _ = pairs_within(stations.lat, stations.lon, RADIUS)
+    keep = greedy_independent_set(len(stations), i, j)
+    assert not (keep[i] & keep[j]).any()
+    covered = np.zeros(len(stations), dtype=bool)
+    covered[i[keep[j]]] = True
+    covered[j[keep[i]]] = True
+    assert (keep | covered).all()